@@ -0,0 +1,131 @@
+import timeit
+import sys
+
+import numpy as np
+import pandas as pd
+
+from fomc_feature_schema import FEATURE_COLUMNS, TARGET
+from fomc_predict import GB_PARAMS, load_training_data, undersample
+
+CLASSES = [-1, 0, 1]
+# Distribuciones del RandomizedSearchCV de 10_prediccion_fomc_final.ipynb. 'auto' se ha quitado de max_features
+# porque GradientBoostingClassifier ya no lo admite en la versión de scikit-learn de requirements_modelado.txt.
+PARAM_DISTRIBUTIONS = {
+    'n_estimators': ('randint', 50, 200),
+    'learning_rate': [0.01, 0.05, 0.1, 0.2, 0.3, 0.5],
+    'max_depth': [3, 5, 7, 9],
+    'min_samples_split': ('randint', 2, 20),
+    'min_samples_leaf': ('randint', 1, 10),
+    'subsample': [0.6, 0.7, 0.8, 0.9, 1.0],
+    'max_features': ['sqrt', 'log2', None]
+}
+
+def sample_configs(n_configs, random_state=42):
+    '''
+    `n_configs` combinaciones de hiperparámetros de PARAM_DISTRIBUTIONS, reproducibles con `random_state`
+    '''
+    rng = np.random.RandomState(random_state)
+    configs = []
+    for _ in range(n_configs):
+        config = {}
+        for name, values in PARAM_DISTRIBUTIONS.items():
+            if isinstance(values, tuple):
+                config[name] = int(rng.randint(values[1], values[2]))
+            else:
+                config[name] = values[rng.randint(len(values))]
+        configs.append(config)
+    return configs
+
+def walk_forward_splits(n_meetings, min_train=120, test_size=8):
+    '''
+    Particiones de ventana creciente sobre las reuniones ordenadas por fecha: cada fold entrena con todas las
+    reuniones anteriores y evalúa con las `test_size` siguientes. Devuelve una lista de (fin del entrenamiento, fin del test).
+    '''
+    return [(train_end, min(train_end + test_size, n_meetings))
+            for train_end in range(min_train, n_meetings, test_size)]
+
+def prepare_fold(data, train_end, test_end, random_state=42):
+    '''
+    Submuestreo y escalado de un fold, como en 10_prediccion_fomc_final.ipynb pero solo con el pasado:
+    el submuestreo y el StandardScaler se ajustan con las reuniones anteriores a `train_end`.
+    '''
+    from sklearn.preprocessing import StandardScaler
+    train = undersample(data.iloc[:train_end], random_state)
+    test = data.iloc[train_end:test_end]
+    scaler = StandardScaler().fit(train[FEATURE_COLUMNS].to_numpy())
+    return (scaler.transform(train[FEATURE_COLUMNS].to_numpy()), train[TARGET].to_numpy(),
+            scaler.transform(test[FEATURE_COLUMNS].to_numpy()), test[TARGET].to_numpy())
+
+def fit_fold(config, data, train_end, test_end, cachedir, random_state=42):
+    '''
+    Ajusta un GradientBoostingClassifier con `config` en un fold y devuelve sus predicciones sobre el test.
+    El preprocesado del fold se guarda en la caché aparte, para que lo reutilicen todas las configuraciones.
+    '''
+    from joblib import Memory
+    from sklearn.ensemble import GradientBoostingClassifier
+    X_train, y_train, X_test, y_test = Memory(cachedir, verbose=0).cache(prepare_fold)(data, train_end, test_end, random_state)
+    model = GradientBoostingClassifier(random_state=random_state, **config).fit(X_train, y_train)
+    # Columnas de probabilidad para las tres clases aunque alguna no aparezca en el entrenamiento del fold
+    probs = np.zeros((len(X_test), len(CLASSES)))
+    probs[:, [CLASSES.index(label) for label in model.classes_]] = model.predict_proba(X_test)
+    return {'y_true': y_test, 'y_pred': np.asarray(CLASSES)[probs.argmax(axis=1)], 'probs': probs}
+
+def _evaluate(config_id, config, fold, data, train_end, test_end, cachedir, random_state):
+    from joblib import Memory
+    from sklearn.metrics import accuracy_score, f1_score
+    result = Memory(cachedir, verbose=0).cache(fit_fold)(config, data, train_end, test_end, cachedir, random_state)
+    return dict(result, config_id=config_id, fold=fold, test_start=data.index[train_end], n_train=train_end,
+                accuracy=accuracy_score(result['y_true'], result['y_pred']),
+                f1_macro=f1_score(result['y_true'], result['y_pred'], labels=CLASSES, average='macro', zero_division=0))
+
+def run_backtest(configs, csv_path='entrenamiento.csv', min_train=120, test_size=8, n_jobs=-1,
+                 cachedir='data/backtest_cache', random_state=42):
+    '''
+    Evalúa cada configuración de `configs` con particiones walk-forward sobre las reuniones de `csv_path`,
+    repartiendo los pares (configuración, fold) entre todos los núcleos con joblib. Cada ajuste se memoriza
+    en `cachedir` por el hash de (configuración, datos, fold), así que al añadir configuraciones solo se
+    ajustan las nuevas.
+    Retorna (tabla de resultados por configuración ordenada por F1 macro, resultados por fold).
+    '''
+    from joblib import Parallel, delayed, hash as joblib_hash
+    from sklearn.metrics import accuracy_score, f1_score
+
+    data = load_training_data(csv_path)[FEATURE_COLUMNS + [TARGET]]
+    splits = walk_forward_splits(len(data), min_train, test_size)
+    config_ids = [joblib_hash(config)[:10] for config in configs]
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate)(config_id, config, fold, data, train_end, test_end, cachedir, random_state)
+        for config_id, config in zip(config_ids, configs)
+        for fold, (train_end, test_end) in enumerate(splits))
+
+    folds = pd.DataFrame([{key: value for key, value in result.items() if key not in ('y_true', 'y_pred', 'probs')}
+                          for result in results])
+    rows = []
+    for config_id, config in dict(zip(config_ids, configs)).items():
+        config_results = [result for result in results if result['config_id'] == config_id]
+        y_true = np.concatenate([result['y_true'] for result in config_results])
+        y_pred = np.concatenate([result['y_pred'] for result in config_results])
+        fold_f1 = folds.loc[folds['config_id'] == config_id, 'f1_macro']
+        rows.append(dict(config_id=config_id, n_folds=len(config_results),
+                         f1_macro=f1_score(y_true, y_pred, labels=CLASSES, average='macro', zero_division=0),
+                         accuracy=accuracy_score(y_true, y_pred),
+                         fold_f1_mean=fold_f1.mean(), fold_f1_std=fold_f1.std(), **config))
+    table = pd.DataFrame(rows).set_index('config_id').sort_values('f1_macro', ascending=False)
+    return table, folds
+
+if __name__ == '__main__':
+    # Benchmark: python fomc_backtest.py [nº de configuraciones]
+    import tempfile
+    n_configs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    configs = [GB_PARAMS] + sample_configs(n_configs)
+    with tempfile.TemporaryDirectory() as cachedir:
+        start = timeit.default_timer()
+        table, folds = run_backtest(configs, cachedir=cachedir)
+        first_time = timeit.default_timer() - start
+        # Segunda búsqueda con 10 configuraciones nuevas: el resto y el preprocesado salen de la caché
+        start = timeit.default_timer()
+        table, folds = run_backtest(configs + sample_configs(10, random_state=1), cachedir=cachedir)
+        second_time = timeit.default_timer() - start
+    print(table.head(10).to_string())
+    print("{} configuraciones x {} folds: {:.1f} s".format(len(configs), folds['fold'].nunique(), first_time))
+    print("Con 10 configuraciones nuevas y la caché: {:.1f} s".format(second_time))
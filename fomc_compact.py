@@ -0,0 +1,184 @@
+from copy import copy, deepcopy
+import pickle
+import timeit
+import sys
+
+import numpy as np
+
+# Atributos de MLPClassifier que solo se usan para seguir entrenando
+_MLP_TRAINING_ATTRIBUTES = ['_optimizer', 'loss_curve_', 'validation_scores_', 'best_validation_score_',
+                            '_best_coefs', '_best_intercepts', '_no_improvement_count', 'best_loss_', 't_']
+
+def identity_replicas(step):
+    '''
+    Número de copias de la entrada que produce `step` si solo copia columnas: un FunctionTransformer(copy)
+    o sin función, 'passthrough', o un FeatureUnion sin pesos cuyas ramas son todas copias (anidadas o no).
+    Retorna None si `step` hace cualquier otra cosa.
+    '''
+    from sklearn.pipeline import FeatureUnion
+    from sklearn.preprocessing import FunctionTransformer
+    if step == 'passthrough':
+        return 1
+    if isinstance(step, FunctionTransformer):
+        if step.func in (None, copy, deepcopy) and not step.kw_args:
+            return 1
+        return None
+    if isinstance(step, FeatureUnion) and step.transformer_weights is None:
+        total = 0
+        for _, transformer in step.transformer_list:
+            if transformer == 'drop':
+                continue
+            replicas = identity_replicas(transformer)
+            if replicas is None:
+                return None
+            total += replicas
+        return total
+    return None
+
+def _is_stacking_estimator(step):
+    # StackingEstimator de TPOT, sin importar tpot para cargar el artefacto
+    return type(step).__name__ == 'StackingEstimator' and hasattr(step, 'estimator')
+
+def _strip(estimator):
+    '''
+    Copia de `estimator` sin el estado de entrenamiento que no hace falta para predecir
+    '''
+    from sklearn.neural_network import MLPClassifier
+    estimator = deepcopy(estimator)
+    if isinstance(estimator, MLPClassifier):
+        for attribute in _MLP_TRAINING_ATTRIBUTES:
+            estimator.__dict__.pop(attribute, None)
+    return estimator
+
+class CompactPipeline:
+    '''
+    Versión solo para predicción de un Pipeline ajustado de scikit-learn/TPOT:
+      - las uniones de FunctionTransformer(copy) se sustituyen por una sola replicación de columnas (np.tile),
+        en lugar de copiar la matriz en cada rama y apilarla en cada nivel de make_union
+      - los StackingEstimator de TPOT se evalúan con una sola pasada del modelo: la clase predicha se obtiene
+        de las probabilidades, igual que hace MLPClassifier.predict
+      - no depende de tpot y no guarda el estado de entrenamiento del MLP
+    Las predicciones son idénticas bit a bit a las del pipeline original.
+    Ejemplo de uso:
+        compact = CompactPipeline.from_pipeline(exported_pipeline)
+        compact.save('data/tpot_compact.pkl')
+        compact = CompactPipeline.load('data/tpot_compact.pkl')
+        y_pred = compact.predict(X)
+    '''
+    def __init__(self, stages, final_estimator):
+        self.stages = stages
+        self.final_estimator = final_estimator
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        '''
+        Compacta un Pipeline ajustado: las etapas de copia consecutivas se multiplican en una sola replicación
+        '''
+        stages = []
+        for _, step in pipeline.steps[:-1]:
+            replicas = identity_replicas(step)
+            if replicas is not None:
+                if stages and stages[-1][0] == 'tile':
+                    replicas *= stages[-1][1]
+                    stages.pop()
+                if replicas != 1:
+                    stages.append(('tile', replicas))
+            elif _is_stacking_estimator(step):
+                stages.append(('stack', _strip(step.estimator)))
+            elif step is not None:
+                stages.append(('transform', step))
+        return cls(stages, _strip(pipeline.steps[-1][1]))
+
+    @staticmethod
+    def _stack(estimator, X):
+        '''
+        Equivalente a StackingEstimator.transform: [clase predicha, probabilidades, X]
+        '''
+        from sklearn.base import is_classifier
+        from sklearn.neural_network import MLPClassifier
+        from sklearn.utils import check_array
+        X = check_array(X)
+        if not (is_classifier(estimator) and hasattr(estimator, 'predict_proba')):
+            return np.hstack((np.reshape(estimator.predict(X), (-1, 1)), X))
+        proba = estimator.predict_proba(X)
+        if not np.all(np.isfinite(proba)):
+            return np.hstack((np.reshape(estimator.predict(X), (-1, 1)), X))
+        if isinstance(estimator, MLPClassifier) and estimator.n_outputs_ > 1 and estimator._label_binarizer.y_type_ == 'multiclass':
+            # LabelBinarizer.inverse_transform de una salida softmax: la clase de mayor probabilidad
+            prediction = estimator.classes_.take(proba.argmax(axis=1), mode='clip')
+        elif isinstance(estimator, MLPClassifier) and estimator.n_outputs_ == 1:
+            # Salida logística: umbral 0.5 sobre la probabilidad de la clase positiva
+            prediction = estimator.classes_[(proba[:, 1] > 0.5).astype(int)]
+        else:
+            prediction = estimator.predict(X)
+        return np.hstack((np.reshape(prediction, (-1, 1)), proba, X))
+
+    def transform(self, X):
+        '''
+        Entrada del estimador final
+        '''
+        for kind, value in self.stages:
+            if kind == 'tile':
+                X = np.tile(np.asarray(X), (1, value))
+            elif kind == 'stack':
+                X = self._stack(value, X)
+            else:
+                X = value.transform(X)
+        return X
+
+    def predict(self, X):
+        return self.final_estimator.predict(self.transform(X))
+
+    def predict_proba(self, X):
+        return self.final_estimator.predict_proba(self.transform(X))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+def _latency_and_peak(func, n_calls):
+    import tracemalloc
+    start = timeit.default_timer()
+    for _ in range(n_calls):
+        func()
+    elapsed = (timeit.default_timer() - start) / n_calls
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1e6
+
+if __name__ == '__main__':
+    # Benchmark: python fomc_compact.py [nº de llamadas]
+    from sklearn.model_selection import train_test_split
+    from tpot_pipeline import make_exported_pipeline
+    from fomc_feature_schema import FEATURE_COLUMNS, TARGET
+    from fomc_predict import load_training_data
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    data = load_training_data()
+    features = data[FEATURE_COLUMNS].astype(np.float64)
+    training_features, testing_features, training_target, testing_target = \
+        train_test_split(features, data[TARGET].astype(np.float64), random_state=42)
+    pipeline = make_exported_pipeline().fit(training_features, training_target)
+    compact = CompactPipeline.from_pipeline(pipeline)
+    print("Etapas compactadas: {}".format([(kind, value if kind == 'tile' else type(value).__name__)
+                                           for kind, value in compact.stages]))
+
+    for X in (testing_features, features, features.iloc[:1]):
+        assert np.array_equal(pipeline.predict(X), compact.predict(X))
+        assert np.array_equal(pipeline.predict_proba(X), compact.predict_proba(X))
+    print("Predicciones idénticas bit a bit")
+
+    print("Tamaño: pipeline {:.2f} MB, artefacto compacto {:.2f} MB".format(
+        len(pickle.dumps(pipeline)) / 1e6, len(pickle.dumps(compact)) / 1e6))
+    for name, X in (('1 fila', features.iloc[:1]), ('{} filas'.format(len(features)), features)):
+        old_time, old_peak = _latency_and_peak(lambda: pipeline.predict(X), n_calls)
+        new_time, new_peak = _latency_and_peak(lambda: compact.predict(X), n_calls)
+        print("{}: pipeline {:.2f} ms / {:.2f} MB, compacto {:.2f} ms / {:.2f} MB ({:.1f}x)".format(
+            name, old_time, old_peak, new_time, new_peak, old_time / new_time))
@@ -0,0 +1,21 @@
+# Variables de entrada de los modelos de predicción de next_decision. Sin dependencias, para que los módulos
+# que solo las necesitan (p. ej. fomc_registry.py) no importen numpy ni pandas
+
+# Columnas de entrenamiento.csv, en el orden en que las usa el modelo de 10_prediccion_fomc_final.ipynb
+FEATURE_COLUMNS = ['predicted_roberta', 'RateDiff', 'prev_decision', 'Employ_diff_year', 'Rsales_diff_year',
+                   'Unemp_diff_year', 'Employ_diff_prev', 'GDP_diff_year', 'PCE_diff_prev', 'Unemp_diff_prev',
+                   'Hsales_diff_year', 'GDP_diff_prev', 'Taylor']
+TARGET = 'next_decision'
+
+# Columnas de pd.get_dummies(df, columns=['prev_decision']): las variables sin prev_decision y sus indicadores al final
+PREV_DECISION_DUMMIES = ['prev_decision_-1', 'prev_decision_0', 'prev_decision_1']
+DUMMY_FEATURE_COLUMNS = [column for column in FEATURE_COLUMNS if column != 'prev_decision'] + PREV_DECISION_DUMMIES
+
+# Redes densas de 9_prediccion_fomc.ipynb (best_model.pkl, best_model_balanced.pkl, best_model/):
+# df.drop(['next_decision', 'date']) tras get_dummies, 15 entradas
+KERAS_FEATURE_COLUMNS = DUMMY_FEATURE_COLUMNS
+
+# AutoKeras en 9_prediccion_fomc.ipynb: X = df.values[:, :-1] tras get_dummies, es decir, todas las columnas salvo
+# la última (prev_decision_1), incluido next_decision; también 15 entradas
+AUTOKERAS_FEATURE_COLUMNS = [column for column in FEATURE_COLUMNS if column != 'prev_decision'] + \
+    [TARGET] + PREV_DECISION_DUMMIES[:-1]
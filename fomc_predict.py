@@ -0,0 +1,254 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import timeit
+import json
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+from fomc_feature_schema import FEATURE_COLUMNS, TARGET
+
+# Mejores hiperparámetros del RandomizedSearchCV de 10_prediccion_fomc_final.ipynb
+GB_PARAMS = {'learning_rate': 0.01, 'max_depth': 5, 'max_features': 'sqrt', 'min_samples_leaf': 1,
+             'min_samples_split': 16, 'n_estimators': 83, 'subsample': 0.6}
+# Valor de predicted_roberta de cada etiqueta de RoBERTa (negative, neutral, positive), como en 9_prediccion_fomc.ipynb
+SENTIMENT_VALUES = np.array([-1.0, 0.0, 1.0])
+
+def load_training_data(csv_path='entrenamiento.csv'):
+    '''
+    Lee entrenamiento.csv con las fechas de las reuniones como índice, ordenado por fecha
+    '''
+    data = pd.read_csv(csv_path, parse_dates=['date'])
+    return data.set_index('date').sort_index()
+
+def undersample(data, random_state=42):
+    '''
+    Submuestreo de las clases de next_decision al tamaño de la menor, como en 10_prediccion_fomc_final.ipynb
+    '''
+    from sklearn.utils import resample
+    classes = [data[data[TARGET] == label] for label in sorted(data[TARGET].unique())]
+    min_count = min(len(class_df) for class_df in classes)
+    return pd.concat([resample(class_df, replace=False, n_samples=min_count, random_state=random_state)
+                      for class_df in classes])
+
+def fit_decision_model(csv_path='entrenamiento.csv', artifact_path='data/decision_model.joblib',
+                       params=None, test_size=0.2, random_state=42):
+    '''
+    Ajusta el StandardScaler y el GradientBoostingClassifier de 10_prediccion_fomc_final.ipynb (mismo submuestreo,
+    misma partición y mejores hiperparámetros) y los guarda en `artifact_path` junto con las columnas y las clases,
+    para que el servicio no tenga que repetir el ajuste. Con `test_size=None` se ajusta con todos los datos.
+    Retorna el diccionario guardado.
+    '''
+    import joblib
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    data = undersample(load_training_data(csv_path), random_state)
+    X, y = data[FEATURE_COLUMNS], data[TARGET]
+    if test_size:
+        X, _, y, _ = train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+    scaler = StandardScaler().fit(X.to_numpy())
+    model = GradientBoostingClassifier(random_state=random_state, **(params or GB_PARAMS))
+    model.fit(scaler.transform(X.to_numpy()), y)
+
+    artifact = {'scaler': scaler, 'model': model, 'columns': FEATURE_COLUMNS,
+                'classes': [int(label) for label in model.classes_], 'params': model.get_params()}
+    if os.path.dirname(artifact_path):
+        os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+    joblib.dump(artifact, artifact_path)
+    return artifact
+
+class DecisionPredictor:
+    '''
+    Predicción de next_decision con el modelo y el scaler ya ajustados, cargados una sola vez:
+      - las variables macro de la última reunión anterior a cada fecha se toman de una tabla en memoria
+        (entrenamiento.csv o cualquier tabla con FEATURE_COLUMNS indexada por fecha)
+      - el sentimiento se obtiene de los textos con un SentimentEngine, que se carga solo si hace falta,
+        y de la caché de puntuaciones, o se pasa ya calculado en `sentiment`
+      - cualquier variable puede sustituirse en la petición
+    Ejemplo de uso:
+        predictor = DecisionPredictor()
+        predictor.predict(date='2023-12-13', text=statement)
+        predictor.predict_many([{'date': '2023-12-13', 'sentiment': 0.0}, ...])
+    '''
+    def __init__(self, artifact_path='data/decision_model.joblib', features_path='entrenamiento.csv',
+                 engine=None, cache=None, state_dict_path=None):
+        import joblib
+        artifact = joblib.load(artifact_path)
+        self.scaler = artifact['scaler']
+        self.model = artifact['model']
+        self.columns = artifact['columns']
+        self.classes = artifact['classes']
+
+        features = load_training_data(features_path) if isinstance(features_path, str) else features_path
+        self.dates = features.index.values.astype('datetime64[ns]')
+        self.features = features[self.columns].to_numpy(dtype=np.float64)
+        self.engine = engine
+        self.cache = cache
+        self.state_dict_path = state_dict_path
+
+    def sentiment(self, texts):
+        '''
+        Valor de predicted_roberta de cada grupo de textos de `texts` (un texto o una lista de textos por
+        elemento): media del valor -1/0/1 de la etiqueta de cada documento. Todos los textos se puntúan juntos.
+        '''
+        if self.engine is None:
+            from fomc_sentiment import SentimentEngine, ROBERTA
+            self.engine = SentimentEngine(ROBERTA, self.state_dict_path)
+        groups = [[group] if isinstance(group, str) else list(group) for group in texts]
+        flat = [text for group in groups for text in group]
+        values = np.zeros(len(flat))
+        for doc, probs in self.engine.score(flat, cache=self.cache):
+            values[doc] = SENTIMENT_VALUES[np.argmax(probs)]
+        bounds = np.cumsum([0] + [len(group) for group in groups])
+        return np.array([values[start:end].mean() for start, end in zip(bounds[:-1], bounds[1:])])
+
+    def feature_rows(self, records):
+        '''
+        Matriz de variables de `records`: las de la última reunión en o antes de 'date' (la última disponible
+        si no hay fecha), con el sentimiento de 'text' o 'sentiment' y las variables que se indiquen en la petición
+        '''
+        dates = np.array([np.datetime64(record['date'], 'ns') if record.get('date') else self.dates[-1]
+                          for record in records], dtype='datetime64[ns]')
+        rows = np.searchsorted(self.dates, dates, side='right') - 1
+        if (rows < 0).any():
+            raise ValueError("No hay variables macro anteriores a {}".format(dates[rows < 0][0]))
+        X = self.features[rows].copy()
+
+        with_text = [i for i, record in enumerate(records) if 'text' in record and 'sentiment' not in record]
+        if with_text:
+            X[with_text, 0] = self.sentiment([records[i]['text'] for i in with_text])
+        for i, record in enumerate(records):
+            if 'sentiment' in record:
+                X[i, 0] = record['sentiment']
+            for j, column in enumerate(self.columns):
+                if column in record:
+                    X[i, j] = record[column]
+        return X, dates
+
+    def predict_many(self, records):
+        '''
+        Probabilidades de next_decision de cada petición de `records`, con una sola llamada al modelo
+        '''
+        X, dates = self.feature_rows(records)
+        probs = self.model.predict_proba(self.scaler.transform(X))
+        return [{'date': str(np.datetime_as_string(date, unit='D')),
+                 'features': dict(zip(self.columns, row.tolist())),
+                 'probabilities': dict(zip(map(str, self.classes), p.tolist())),
+                 'prediction': self.classes[int(np.argmax(p))]}
+                for date, row, p in zip(dates, X, probs)]
+
+    def predict(self, **record):
+        return self.predict_many([record])[0]
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    '''
+    Peticiones JSON:
+      POST /predict       {"date": "2023-12-13", "text": "..."}  o  {"sentiment": 0.5, ...}
+      POST /predict/bulk  [{...}, {...}, ...]
+      GET  /health
+    '''
+    predictor = None
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {'status': 'ok', 'last_date': str(np.datetime_as_string(self.predictor.dates[-1], unit='D'))})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            if self.path == '/predict':
+                if not isinstance(body, dict):
+                    raise ValueError("el cuerpo debe ser un objeto JSON")
+                self._send(200, self.predictor.predict(**body))
+            elif self.path == '/predict/bulk':
+                if not isinstance(body, list) or not all(isinstance(item, dict) for item in body):
+                    raise ValueError("el cuerpo debe ser una lista de objetos JSON")
+                self._send(200, self.predictor.predict_many(body))
+            else:
+                self._send(404, {'error': 'not found'})
+        except (ValueError, TypeError, KeyError) as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            # Cualquier otro fallo se responde en JSON en lugar de cortar la conexión
+            self._send(500, {'error': '{}: {}'.format(type(e).__name__, e)})
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(predictor, host='127.0.0.1', port=8000):
+    '''
+    Sirve `predictor` por HTTP hasta que se interrumpa
+    '''
+    PredictionHandler.predictor = predictor
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    print("Sirviendo predicciones en http://{}:{}".format(host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def _latency(func, n_calls):
+    times = []
+    for _ in range(n_calls):
+        start = timeit.default_timer()
+        func()
+        times.append(timeit.default_timer() - start)
+    return np.percentile(np.array(times) * 1000, [50, 99])
+
+if __name__ == '__main__':
+    # python fomc_predict.py fit | serve [puerto] | benchmark [nº de llamadas]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'benchmark'
+    if command == 'fit':
+        artifact = fit_decision_model()
+        print("Modelo guardado en data/decision_model.joblib, clases {}".format(artifact['classes']))
+    elif command == 'serve':
+        serve(DecisionPredictor(), port=int(sys.argv[2]) if len(sys.argv) > 2 else 8000)
+    else:
+        # Latencia con el texto ya puntuado: una petición, y todas las reuniones de entrenamiento.csv de una vez
+        import threading
+        import urllib.request
+        n_calls = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        if not os.path.exists('data/decision_model.joblib'):
+            fit_decision_model()
+        start = timeit.default_timer()
+        predictor = DecisionPredictor()
+        print("Carga del servicio: {:.1f} ms".format((timeit.default_timer() - start) * 1000))
+
+        history = load_training_data()
+        record = {'date': '2023-11-01', 'sentiment': 0.0}
+        bulk = [{'date': str(date.date()), 'sentiment': value} for date, value in history['predicted_roberta'].items()]
+        p50, p99 = _latency(lambda: predictor.predict(**record), n_calls)
+        print("predict:                  p50 {:.2f} ms, p99 {:.2f} ms".format(p50, p99))
+        p50, p99 = _latency(lambda: predictor.predict_many(bulk), max(1, n_calls // 10))
+        print("predict_many ({} filas):  p50 {:.2f} ms, p99 {:.2f} ms".format(len(bulk), p50, p99))
+
+        PredictionHandler.predictor = predictor
+        server = ThreadingHTTPServer(('127.0.0.1', 0), PredictionHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://127.0.0.1:{}/predict'.format(server.server_address[1])
+        data = json.dumps(record).encode('utf-8')
+        post = lambda: urllib.request.urlopen(urllib.request.Request(url, data, {'Content-Type': 'application/json'})).read()
+        p50, p99 = _latency(post, n_calls)
+        print("POST /predict:            p50 {:.2f} ms, p99 {:.2f} ms".format(p50, p99))
+        server.shutdown()
+
+        # Antes: cada predicción volvía a leer entrenamiento.csv, submuestrear y ajustar el scaler y el modelo
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            refit_time = timeit.timeit(lambda: fit_decision_model(artifact_path=os.path.join(tmp_dir, 'model.joblib')), number=1)
+        print("Reajuste del cuaderno por predicción: {:.1f} ms".format(refit_time * 1000))
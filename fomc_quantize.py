@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+import timeit
+import sys
+import io
+import os
+
+import numpy as np
+
+def quantize_model(model):
+    '''
+    Cuantización dinámica a int8 de las capas lineales de un modelo de PyTorch (pesos en int8,
+    activaciones cuantizadas al vuelo). Sirve para los clasificadores y para BART con `generate`.
+    '''
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def model_size(model):
+    '''
+    Tamaño en bytes de los pesos de un modelo de PyTorch, cuantizado o no
+    '''
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+def use_int8(engine):
+    '''
+    Sustituye el modelo de un SentimentEngine o Summarizer por su versión cuantizada a int8.
+    La revisión cambia para que la caché de puntuaciones no mezcle resultados de fp32 e int8.
+    '''
+    engine.model = quantize_model(engine.model)
+    if hasattr(engine, 'revision'):
+        engine.revision += ':int8'
+    return engine
+
+def export_onnx(engine, onnx_path, quantize=True, opset=14):
+    '''
+    Exporta el clasificador de un SentimentEngine a ONNX con ejes dinámicos de lote y secuencia y,
+    con `quantize`, lo cuantiza dinámicamente a int8 con ONNX Runtime.
+    Retorna la ruta del modelo que se debe servir.
+    '''
+    import torch
+    if os.path.dirname(onnx_path):
+        os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    dummy = engine.tokenizer(["The Committee decided to maintain the target range."], return_tensors='pt')
+    input_names = ['input_ids', 'attention_mask']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+    with torch.inference_mode():
+        torch.onnx.export(engine.model, (dummy['input_ids'], dummy['attention_mask']), onnx_path,
+                          input_names=input_names, output_names=['logits'], dynamic_axes=dynamic_axes,
+                          opset_version=opset)
+    if not quantize:
+        return onnx_path
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantized_path = os.path.splitext(onnx_path)[0] + '.int8.onnx'
+    quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+class OnnxSequenceClassifier:
+    '''
+    Clasificador servido con ONNX Runtime con la interfaz que usa SentimentEngine:
+    `model(input_ids=..., attention_mask=...).logits`
+    '''
+    def __init__(self, onnx_path, num_threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = num_threads or os.cpu_count()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.onnx_path = onnx_path
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, input_ids, attention_mask, **kwargs):
+        import torch
+        logits = self.session.run(['logits'], {'input_ids': input_ids.numpy().astype(np.int64),
+                                               'attention_mask': attention_mask.numpy().astype(np.int64)})[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+def use_onnx(engine, onnx_path):
+    '''
+    Sirve el clasificador de un SentimentEngine con el modelo ONNX de `onnx_path`
+    '''
+    engine.model = OnnxSequenceClassifier(onnx_path, engine.torch.get_num_threads())
+    engine.revision += ':onnx:' + os.path.basename(onnx_path)
+    return engine
+
+def _scores(engine, texts):
+    probs = np.zeros((len(texts), len(engine.labels)))
+    for doc, doc_probs in engine.score(texts):
+        probs[doc] = doc_probs
+    return probs
+
+def parity_report(reference, candidates, texts, stored_labels=None):
+    '''
+    Compara los SentimentEngine de `candidates` ({nombre: motor}) con el motor fp32 `reference` sobre `texts`:
+    latencia, tamaño del modelo, diferencia de probabilidades, concordancia de etiquetas con fp32 y,
+    si se dan, con las etiquetas guardadas en el corpus (`stored_labels`, p. ej. predicted_roberta,
+    como texto o con el mapeo -1/0/1 de los cuadernos).
+    Retorna un DataFrame con una fila por motor.
+    '''
+    import pandas as pd
+    mapping = {-1: 'negative', 0: 'neutral', 1: 'positive'}
+    if stored_labels is not None:
+        stored_labels = np.array([mapping.get(label, label) for label in stored_labels], dtype=object)
+
+    rows = []
+    reference_probs = None
+    for name, engine in [('fp32', reference)] + list(candidates.items()):
+        start = timeit.default_timer()
+        probs = _scores(engine, texts)
+        elapsed = timeit.default_timer() - start
+        if reference_probs is None:
+            reference_probs, reference_time = probs, elapsed
+        labels = np.array(engine.labels, dtype=object)[probs.argmax(axis=1)]
+        size = os.path.getsize(engine.model.onnx_path) if isinstance(engine.model, OnnxSequenceClassifier) else model_size(engine.model)
+        rows.append({
+            'engine': name,
+            'seconds': elapsed,
+            'speedup': reference_time / elapsed,
+            'model_mb': size / 1e6,
+            'max_abs_diff': np.abs(probs - reference_probs).max(),
+            'mean_abs_diff': np.abs(probs - reference_probs).mean(),
+            'agreement_fp32': (probs.argmax(axis=1) == reference_probs.argmax(axis=1)).mean(),
+            'agreement_stored': (labels == stored_labels).mean() if stored_labels is not None else np.nan
+        })
+    return pd.DataFrame(rows).set_index('engine')
+
+if __name__ == '__main__':
+    # Informe de paridad: python fomc_quantize.py [modelo] [nº de textos] [directorio ONNX]
+    from fomc_sentiment import SentimentEngine, ROBERTA, _synthetic_texts
+    model_name = sys.argv[1] if len(sys.argv) > 1 else ROBERTA
+    n_texts = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    onnx_dir = sys.argv[3] if len(sys.argv) > 3 else None
+    texts = _synthetic_texts(n_texts)
+
+    candidates = {'int8': use_int8(SentimentEngine(model_name))}
+    if onnx_dir:
+        onnx_engine = SentimentEngine(model_name)
+        onnx_path = export_onnx(onnx_engine, os.path.join(onnx_dir, model_name.split('/')[-1] + '.onnx'))
+        candidates['onnx-int8'] = use_onnx(onnx_engine, onnx_path)
+    print(parity_report(SentimentEngine(model_name), candidates, texts).to_string())
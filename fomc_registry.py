@@ -0,0 +1,234 @@
+import pickletools
+import hashlib
+import pickle
+import timeit
+import json
+import glob
+import sys
+import os
+
+from fomc_feature_schema import FEATURE_COLUMNS, KERAS_FEATURE_COLUMNS, AUTOKERAS_FEATURE_COLUMNS
+
+AUTOKERAS_DIR = 'structured_data_classifier'
+# Datos de entrenamiento de todos los modelos de 9_prediccion_fomc.ipynb y 10_prediccion_fomc_final.ipynb
+TRAINING_DATA = 'entrenamiento.csv'
+
+def artifact_revision(path):
+    '''
+    SHA-256 de un artefacto: del archivo o, si es un directorio (SavedModel, checkpoint), de sus archivos en orden
+    '''
+    # fomc_score_cache importa numpy: solo se carga al indexar, no al abrir el registro
+    from fomc_score_cache import file_revision
+    if not os.path.isdir(path):
+        return file_revision(path)
+    digest = hashlib.sha256()
+    for filepath in sorted(glob.glob(os.path.join(path, '**', '*'), recursive=True)):
+        if os.path.isfile(filepath):
+            digest.update(os.path.relpath(filepath, path).encode('utf-8'))
+            digest.update(bytes.fromhex(file_revision(filepath)))
+    return digest.hexdigest()
+
+def artifact_stat(path):
+    '''
+    (tamaño total, última modificación) de un artefacto, para detectar cambios sin volver a calcular su hash
+    '''
+    paths = [path] if not os.path.isdir(path) else \
+        [p for p in glob.glob(os.path.join(path, '**', '*'), recursive=True) if os.path.isfile(p)]
+    return sum(os.path.getsize(p) for p in paths), max(os.path.getmtime(p) for p in paths)
+
+def pickle_module(path):
+    '''
+    Módulo del primer objeto de un pickle (p. ej. 'keras.saving.pickle_utils' o 'sklearn.ensemble._gb'),
+    leyendo solo su cabecera
+    '''
+    with open(path, 'rb') as f:
+        header = f.read(512)
+    strings = []
+    try:
+        for opcode, arg, _ in pickletools.genops(header):
+            if opcode.name == 'GLOBAL':
+                return arg.split(' ')[0]
+            if opcode.name == 'STACK_GLOBAL':
+                return strings[-2]
+            if isinstance(arg, str):
+                strings.append(arg)
+    except ValueError:
+        pass
+    return None
+
+def _last_observation(metric):
+    observations = metric.get('observations') or [{}]
+    value = observations[-1].get('value')
+    return value[0] if isinstance(value, list) else value
+
+def _autokeras_entries(root, autokeras_dir, training_data):
+    '''
+    Una entrada por prueba de AutoKeras (pesos del checkpoint) y otra para el mejor modelo exportado,
+    con las métricas de trial.json
+    '''
+    entries = []
+    trials = []
+    for trial_path in sorted(glob.glob(os.path.join(root, autokeras_dir, 'trial_*', 'trial.json'))):
+        with open(trial_path) as f:
+            trial = json.load(f)
+        metrics = {name: _last_observation(metric) for name, metric in trial['metrics']['metrics'].items()}
+        metrics['score'] = trial['score']
+        trials.append(trial)
+        entries.append({'name': 'autokeras/trial_' + trial['trial_id'], 'kind': 'keras_checkpoint',
+                        'path': os.path.relpath(os.path.join(os.path.dirname(trial_path), 'checkpoint'), root),
+                        'metrics': metrics, 'hyperparameters': trial['hyperparameters']['values'],
+                        'status': trial['status'], 'best_step': trial['best_step'],
+                        'feature_schema': AUTOKERAS_FEATURE_COLUMNS, 'training_data': training_data})
+
+    best_path = os.path.join(autokeras_dir, 'best_model')
+    if os.path.isdir(os.path.join(root, best_path)) and entries:
+        # El oráculo de AutoKeras se queda con la primera prueba de mayor puntuación
+        best = max(range(len(trials)), key=lambda i: (trials[i]['score'] or 0, -i))
+        entries.append(dict(entries[best], name='autokeras/best_model', kind='keras_saved_model', path=best_path,
+                            source_trial=entries[best]['name']))
+    return entries
+
+class ModelRegistry:
+    '''
+    Registro local de los modelos entrenados: un índice JSON con el tipo, las métricas, las variables de entrada,
+    el hash de los datos de entrenamiento y el hash de cada artefacto. Abrir el registro y elegir un modelo solo lee
+    el índice; el modelo elegido se carga al pedirlo (y una sola vez), con los arrays de joblib mapeados en memoria.
+    Ejemplo de uso:
+        registry = ModelRegistry()
+        entry = registry.best('val_accuracy')
+        model = registry.load(entry['name'])
+    '''
+    def __init__(self, index_path='data/model_registry.json', root='.'):
+        self.index_path = index_path
+        self.root = root
+        self.entries = {}
+        self._loaded = {}
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.entries = {entry['name']: entry for entry in json.load(f)}
+
+    def register(self, name, path, kind=None, metrics=None, feature_schema=None, training_data=None, **extra):
+        '''
+        Añade o actualiza un modelo. `kind` se deduce de la ruta si no se indica:
+        'keras_saved_model', 'keras_checkpoint', 'joblib', 'keras_pickle' o 'pickle'.
+        '''
+        full_path = os.path.join(self.root, path)
+        if kind is None:
+            if os.path.isdir(full_path):
+                kind = 'keras_saved_model'
+            elif path.endswith('.joblib'):
+                kind = 'joblib'
+            else:
+                module = pickle_module(full_path) or ''
+                kind = 'keras_pickle' if module.startswith('keras') else 'pickle'
+        size, mtime = artifact_stat(full_path if kind != 'keras_checkpoint' else os.path.dirname(full_path))
+        entry = dict(extra, name=name, kind=kind, path=path, metrics=metrics or {},
+                     feature_schema=feature_schema, training_data=training_data, size=size, mtime=mtime,
+                     revision=artifact_revision(full_path if kind != 'keras_checkpoint' else os.path.dirname(full_path)))
+        self.entries[name] = entry
+        self._loaded.pop(name, None)
+        return entry
+
+    def scan(self):
+        '''
+        Indexa los modelos del repositorio: best_model.pkl, best_model_balanced.pkl, best_model/, las pruebas y el
+        mejor modelo de AutoKeras, y los artefactos de fomc_predict.py y fomc_compact.py si existen.
+        Los artefactos que no han cambiado desde el último índice no se vuelven a leer.
+        '''
+        training_data = None
+        if os.path.exists(os.path.join(self.root, TRAINING_DATA)):
+            training_data = {'path': TRAINING_DATA, 'revision': artifact_revision(os.path.join(self.root, TRAINING_DATA))}
+
+        # Variables de entrada con las que se entrenó cada modelo (ver fomc_feature_schema.py)
+        candidates = [{'name': name, 'path': path, 'feature_schema': schema, 'training_data': training_data}
+                      for name, path, schema in (('best_model', 'best_model.pkl', KERAS_FEATURE_COLUMNS),
+                                                 ('best_model_balanced', 'best_model_balanced.pkl', KERAS_FEATURE_COLUMNS),
+                                                 ('best_model_saved', 'best_model', KERAS_FEATURE_COLUMNS),
+                                                 ('decision_model', 'data/decision_model.joblib', FEATURE_COLUMNS),
+                                                 ('tpot_compact', 'data/tpot_compact.pkl', FEATURE_COLUMNS))]
+        candidates += _autokeras_entries(self.root, AUTOKERAS_DIR, training_data)
+        for candidate in candidates:
+            full_path = os.path.join(self.root, candidate['path'])
+            if not os.path.exists(full_path):
+                continue
+            stat_path = os.path.dirname(full_path) if candidate.get('kind') == 'keras_checkpoint' else full_path
+            previous = self.entries.get(candidate['name'])
+            if previous and previous['path'] == candidate['path'] and \
+                    (previous['size'], previous['mtime']) == artifact_stat(stat_path) and \
+                    previous['training_data'] == candidate['training_data'] and \
+                    previous['feature_schema'] == candidate['feature_schema']:
+                continue
+            candidate = dict(candidate)
+            self.register(candidate.pop('name'), candidate.pop('path'), **candidate)
+        return self
+
+    def save(self):
+        if os.path.dirname(self.index_path):
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(list(self.entries.values()), f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def best(self, metric='score', kind=None, maximize=True):
+        '''
+        Entrada con el mejor valor de `metric` (opcionalmente solo de un tipo de artefacto)
+        '''
+        entries = [entry for entry in self.entries.values()
+                   if entry['metrics'].get(metric) is not None and (kind is None or entry['kind'] == kind)]
+        if not entries:
+            raise KeyError("Ningún modelo registrado tiene la métrica '{}'".format(metric))
+        return (max if maximize else min)(entries, key=lambda entry: entry['metrics'][metric])
+
+    def check_schema(self, name, columns):
+        '''
+        Comprueba que `columns` son las variables de entrada con las que se entrenó el modelo `name`
+        '''
+        schema = self.entries[name]['feature_schema']
+        if schema is not None and list(columns) != list(schema):
+            raise ValueError("Las columnas no coinciden con las del modelo {}: {}".format(name, schema))
+
+    def load(self, name):
+        '''
+        Carga el modelo `name` la primera vez que se pide, importando solo la librería que necesita
+        '''
+        if name in self._loaded:
+            return self._loaded[name]
+        entry = self.entries[name]
+        path = os.path.join(self.root, entry['path'])
+        if entry['kind'] == 'joblib':
+            import joblib
+            model = joblib.load(path, mmap_mode='r')
+        elif entry['kind'] == 'keras_saved_model':
+            import tensorflow as tf
+            model = tf.keras.models.load_model(path)
+        elif entry['kind'] == 'keras_checkpoint':
+            # Los checkpoints de las pruebas solo guardan los pesos: se leen variable a variable al pedirlas
+            import tensorflow as tf
+            model = tf.train.load_checkpoint(path)
+        else:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+        self._loaded[name] = model
+        return model
+
+    def summary(self):
+        '''
+        Tabla de los modelos registrados con sus métricas
+        '''
+        import pandas as pd
+        rows = [dict({'name': entry['name'], 'kind': entry['kind'], 'size_kb': entry['size'] / 1e3}, **entry['metrics'])
+                for entry in self.entries.values()]
+        return pd.DataFrame(rows).set_index('name')
+
+if __name__ == '__main__':
+    # python fomc_registry.py [métrica]: indexa los modelos y mide la apertura del registro y la elección del mejor
+    metric = sys.argv[1] if len(sys.argv) > 1 else 'val_accuracy'
+    scan_time = timeit.timeit(lambda: ModelRegistry().scan().save(), number=1)
+    rescan_time = timeit.timeit(lambda: ModelRegistry().scan().save(), number=1)
+    open_time = timeit.timeit(lambda: ModelRegistry().best(metric), number=20) / 20
+    registry = ModelRegistry()
+    print(registry.summary().to_string())
+    print("Mejor por {}: {}".format(metric, registry.best(metric)['name']))
+    print("Indexado: {:.1f} ms, reindexado sin cambios: {:.1f} ms, apertura y elección: {:.2f} ms".format(
+        scan_time * 1000, rescan_time * 1000, open_time * 1000))
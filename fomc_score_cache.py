@@ -0,0 +1,111 @@
+import hashlib
+import sqlite3
+import timeit
+import os
+
+import numpy as np
+
+# Máximo de parámetros por consulta que admiten las versiones antiguas de SQLite
+_MAX_VARIABLES = 900
+
+def normalize_segment(segment):
+    '''
+    Normaliza un segmento de texto para la caché: espacios en blanco consecutivos se reducen a uno
+    '''
+    return ' '.join(segment.split())
+
+def segment_key(segment):
+    '''
+    Clave de un segmento: SHA-256 del texto normalizado o, si el segmento son identificadores
+    de tokens, de su representación en int32
+    '''
+    if isinstance(segment, str):
+        data = normalize_segment(segment).encode('utf-8')
+    else:
+        data = np.asarray(segment, dtype=np.int32).tobytes()
+    return hashlib.sha256(data).digest()
+
+def file_revision(filepath):
+    '''
+    Revisión de unos pesos guardados en disco: SHA-256 de su contenido
+    '''
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ScoreCache:
+    '''
+    Caché en disco (SQLite) de las puntuaciones de sentimiento por segmento, con clave
+    (modelo, revisión del modelo, hash del segmento normalizado). Los comunicados históricos no
+    cambian, así que al volver a puntuar el corpus solo se ejecuta el modelo sobre los segmentos nuevos.
+    Ejemplo de uso:
+        cache = ScoreCache('data/sentiment_scores.sqlite')
+        scores = cache.get_many(model, revision, keys)
+        cache.put_many(model, revision, zip(keys, probs))
+    '''
+    def __init__(self, path='data/sentiment_scores.sqlite'):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS scores (
+                                 model TEXT NOT NULL,
+                                 revision TEXT NOT NULL,
+                                 segment BLOB NOT NULL,
+                                 scores BLOB NOT NULL,
+                                 PRIMARY KEY (model, revision, segment)
+                             ) WITHOUT ROWID''')
+        self.conn.commit()
+
+    def get_many(self, model, revision, keys):
+        '''
+        Puntuaciones guardadas de las claves `keys`: diccionario {clave: array float32}
+        '''
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(keys), _MAX_VARIABLES):
+            chunk = keys[start:start + _MAX_VARIABLES]
+            rows = self.conn.execute(
+                'SELECT segment, scores FROM scores WHERE model = ? AND revision = ? AND segment IN ({})'.format(','.join('?' * len(chunk))),
+                [model, revision] + chunk)
+            for segment, scores in rows:
+                found[bytes(segment)] = np.frombuffer(scores, dtype=np.float32)
+        return found
+
+    def put_many(self, model, revision, items):
+        '''
+        Guarda las puntuaciones de los pares (clave, probabilidades) de `items` en una sola transacción
+        '''
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)',
+                                  ((model, revision, key, np.asarray(scores, dtype=np.float32).tobytes()) for key, scores in items))
+
+    def count(self, model=None, revision=None):
+        '''
+        Número de segmentos guardados, en total o de un modelo y revisión
+        '''
+        if model is None:
+            return self.conn.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+        return self.conn.execute('SELECT COUNT(*) FROM scores WHERE model = ? AND revision = ?', (model, revision)).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+if __name__ == '__main__':
+    # Benchmark: escritura y lectura de las puntuaciones de 100.000 segmentos
+    import tempfile
+    n_segments = 100000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ScoreCache(os.path.join(tmp_dir, 'scores.sqlite'))
+        keys = [segment_key('segment {}'.format(i)) for i in range(n_segments)]
+        probs = np.random.RandomState(0).dirichlet(np.ones(3), n_segments).astype(np.float32)
+        put_time = timeit.timeit(lambda: cache.put_many('roberta', 'rev', zip(keys, probs)), number=1)
+        get_time = timeit.timeit(lambda: cache.get_many('roberta', 'rev', keys), number=1)
+        found = cache.get_many('roberta', 'rev', keys)
+        assert all(np.array_equal(found[key], p) for key, p in zip(keys, probs))
+        print("{} segmentos: escritura {:.2f} s, lectura {:.2f} s".format(n_segments, put_time, get_time))
+        cache.close()
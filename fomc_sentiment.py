@@ -0,0 +1,366 @@
+import timeit
+import sys
+import os
+
+import numpy as np
+
+from fomc_score_cache import segment_key, file_revision
+
+ROBERTA = 'cardiffnlp/twitter-roberta-base-sentiment'
+FINBERT_TONE = 'yiyanghkust/finbert-tone'
+
+def dividir_texto_en_segmentos(texto, max_length=510):
+    '''
+    Divide el texto en segmentos de como máximo `max_length` caracteres sin cortar palabras,
+    igual que en 6_obtencion_sentimiento_sin_reentreno.ipynb (deja espacio para [CLS] y [SEP])
+    '''
+    segmentos = []
+    segmento_actual = []
+    longitud_actual = 0
+    for palabra in texto.split():
+        # +1 por el espacio; si la palabra hace que el segmento exceda max_length, empezamos un nuevo segmento
+        if longitud_actual + len(palabra) + 1 > max_length:
+            segmentos.append(" ".join(segmento_actual))
+            segmento_actual = [palabra]
+            longitud_actual = len(palabra) + 1
+        else:
+            segmento_actual.append(palabra)
+            longitud_actual += len(palabra) + 1
+    if segmento_actual:
+        segmentos.append(" ".join(segmento_actual))
+    return segmentos
+
+def char_budget_windows(lengths, max_length=510):
+    '''
+    Ventanas [inicio, fin) de palabras que forma dividir_texto_en_segmentos a partir de la longitud de cada
+    palabra, con el mismo criterio (incluido el segmento vacío si la primera palabra no cabe)
+    '''
+    windows = []
+    start = 0
+    longitud_actual = 0
+    for i, longitud in enumerate(lengths):
+        if longitud_actual + longitud + 1 > max_length:
+            windows.append((start, i))
+            start = i
+            longitud_actual = longitud + 1
+        else:
+            longitud_actual += longitud + 1
+    if start < len(lengths):
+        windows.append((start, len(lengths)))
+    return windows
+
+def segment_spans(text, max_length=510):
+    '''
+    Equivalente de dividir_texto_en_segmentos que devuelve las posiciones en lugar de los textos.
+    Retorna el texto con los espacios normalizados (las palabras unidas por un espacio, como cada segmento)
+    y, para cada segmento, (inicio, fin del segmento, fin de su primera palabra) en ese texto.
+    Un texto sin palabras tiene un único segmento vacío.
+    '''
+    words = text.split()
+    normalized = " ".join(words)
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+    starts = np.cumsum(lengths + 1) - lengths - 1
+    ends = starts + lengths
+    spans = [(starts[a], ends[b - 1], ends[a]) if b > a else (0, 0, 0)
+             for a, b in char_budget_windows(lengths.tolist(), max_length)] or [(0, 0, 0)]
+    return normalized, np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+
+class TokenOffsets:
+    '''
+    Tokenización de un texto con un tokenizer rápido de transformers como array de posiciones [inicio, fin)
+    de cada token en el texto, junto con sus identificadores. Los fragmentos del texto se convierten en rangos
+    de tokens por sus posiciones, sin volver a tokenizarlos.
+    Ejemplo de uso:
+        offsets = TokenOffsets.from_tokenizer(text, tokenizer)
+        input_ids = offsets.input_ids(offsets.token_range(start, end))
+    '''
+    def __init__(self, text, offsets, ids, tokenizer):
+        self.text = text
+        self.offsets = offsets
+        self.ids = ids
+        self.tokenizer = tokenizer
+
+    @classmethod
+    def from_tokenizer(cls, text, tokenizer):
+        '''
+        Posiciones e identificadores de los tokens del modelo para `text`, sin tokens especiales
+        '''
+        return cls.many([text], tokenizer)[0]
+
+    @classmethod
+    def many(cls, texts, tokenizer):
+        '''
+        `from_tokenizer` para una lista de textos, con una sola llamada al tokenizer
+        '''
+        texts = list(texts)
+        if not texts:
+            return []
+        encoding = tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True,
+                             return_attention_mask=False, verbose=False)
+        return [cls(text, np.asarray(offsets, dtype=np.int64).reshape(-1, 2), np.asarray(ids, dtype=np.int64), tokenizer)
+                for text, offsets, ids in zip(texts, encoding['offset_mapping'], encoding['input_ids'])]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def token_range(self, start, end):
+        '''
+        Índices [inicio, fin) de los tokens que empiezan en las posiciones [start, end) del texto
+        '''
+        return tuple(np.searchsorted(self.offsets[:, 0], [start, end], side='left'))
+
+    def input_ids(self, window, prefix_ids=(), max_tokens=None):
+        '''
+        Identificadores de `prefix_ids` y de los tokens de `window` con los tokens especiales del modelo,
+        sin volver a tokenizar el texto; como máximo `max_tokens` sin contar los especiales
+        '''
+        start, end = window
+        ids = list(prefix_ids) + self.ids[start:end].tolist()
+        return self.tokenizer.build_inputs_with_special_tokens(ids[:max_tokens])
+
+def segment_input_ids(texts, tokenizer, max_chars=510, max_length=512):
+    '''
+    Identificadores de tokens (con los tokens especiales y truncados a `max_length`) de los segmentos de
+    dividir_texto_en_segmentos de cada texto, y el índice del documento de cada segmento.
+    Cada documento se tokeniza una sola vez y los segmentos son rangos de sus tokens. Solo la primera palabra
+    de cada segmento se tokeniza aparte: dentro del documento lleva el espacio anterior (el prefijo Ġ del BPE
+    de RoBERTa), que no tiene al empezar un segmento. Los identificadores son los mismos que al tokenizar
+    cada segmento por separado.
+    '''
+    documents = [segment_spans(text, max_chars) for text in texts]
+    offsets = TokenOffsets.many([normalized for normalized, _ in documents], tokenizer)
+    first_words = [normalized[start:first_end] for normalized, spans in documents for start, _, first_end in spans]
+    first_ids = tokenizer(first_words, add_special_tokens=False)['input_ids'] if first_words else []
+    max_tokens = max_length - tokenizer.num_special_tokens_to_add()
+
+    segments, doc_index = [], []
+    position = 0
+    for i, ((_, spans), doc_offsets) in enumerate(zip(documents, offsets)):
+        for _, end, first_end in spans:
+            segments.append(doc_offsets.input_ids(doc_offsets.token_range(first_end, end), first_ids[position], max_tokens))
+            doc_index.append(i)
+            position += 1
+    return segments, np.asarray(doc_index, dtype=np.intp)
+
+def length_batches(lengths, token_budget=16384, max_batch_size=64):
+    '''
+    Agrupa los segmentos por longitud: los ordena de mayor a menor y forma lotes consecutivos
+    mientras (nº de segmentos × longitud del más largo) no supere `token_budget`, de modo que
+    cada lote se rellena solo hasta la longitud de sus propios segmentos.
+    Devuelve una lista de arrays de índices.
+    '''
+    order = np.argsort(-np.asarray(lengths), kind='stable')
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = lengths[order[start]]
+        size = max(1, min(max_batch_size, token_budget // max(longest, 1)))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+class SentimentEngine:
+    '''
+    Motor de inferencia de sentimiento en CPU para los modelos de clasificación de secuencias
+    (RoBERTa, FinBERT) sobre los documentos del FOMC:
+      - divide cada documento en segmentos y los tokeniza todos de una vez con el tokenizer rápido
+      - ordena los segmentos por longitud y forma lotes dinámicos con un presupuesto de tokens,
+        rellenando cada lote solo hasta su segmento más largo
+      - ejecuta el modelo bajo `torch.inference_mode` con el número de threads indicado
+      - devuelve las puntuaciones de cada documento en cuanto se han puntuado todos sus segmentos
+    Ejemplo de uso:
+        engine = SentimentEngine(ROBERTA)
+        for index, probs in engine.score(texts):
+            ...
+        df_scores = engine.score_df(df)
+    '''
+    def __init__(self, model_name=ROBERTA, state_dict_path=None, max_length=512, max_chars=510,
+                 token_budget=16384, max_batch_size=64, num_threads=None, revision=None):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        self.torch = torch
+        torch.set_num_threads(num_threads or os.cpu_count())
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        if state_dict_path:
+            # Pesos reentrenados (p. ej. best_model_5e-05_64_V2.pt de 9_prediccion_fomc.ipynb)
+            self.model.load_state_dict(torch.load(state_dict_path, map_location=torch.device("cpu")))
+        self.model.eval()
+        self.labels = [self.model.config.id2label[i].lower() for i in range(self.model.config.num_labels)]
+        # Revisión del modelo para la caché de puntuaciones: la de los pesos reentrenados o la del hub
+        if revision is None:
+            revision = file_revision(state_dict_path) if state_dict_path else getattr(self.model.config, '_commit_hash', None) or 'local'
+        self.revision = '{}:{}:{}'.format(revision, max_length, max_chars)
+
+        self.max_length = max_length
+        self.max_chars = max_chars
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+
+    def segment(self, texts):
+        '''
+        Segmentos de todos los documentos, como identificadores de tokens, y el índice del documento de cada uno.
+        Con `max_chars` los segmentos son los de dividir_texto_en_segmentos, como en los cuadernos, tomados de
+        una sola tokenización de cada documento (segment_input_ids); con `max_chars=None` el propio tokenizer
+        divide cada documento en ventanas de `max_length` tokens.
+        '''
+        if self.max_chars:
+            return segment_input_ids(texts, self.tokenizer, self.max_chars, self.max_length)
+        encoding = self.tokenizer(list(texts), truncation=True, max_length=self.max_length,
+                                  return_overflowing_tokens=True)
+        return encoding['input_ids'], np.asarray(encoding['overflow_to_sample_mapping'], dtype=np.intp)
+
+    def score_segments(self, input_ids):
+        '''
+        Probabilidades de cada etiqueta para cada segmento tokenizado, por lotes ordenados por longitud.
+        Genera (índices de los segmentos del lote, probabilidades) a medida que se puntúa cada lote.
+        '''
+        lengths = [len(ids) for ids in input_ids]
+        for batch in length_batches(lengths, self.token_budget, self.max_batch_size):
+            inputs = self.tokenizer.pad({'input_ids': [input_ids[i] for i in batch]}, return_tensors='pt')
+            with self.torch.inference_mode():
+                logits = self.model(**inputs).logits
+            yield batch, self.torch.softmax(logits, dim=1).numpy()
+
+    def score(self, texts, aggregate='mean', cache=None):
+        '''
+        Genera (índice del documento, probabilidades agregadas) para cada documento de `texts` en cuanto
+        se han puntuado todos sus segmentos. `aggregate` es 'mean' (media de las probabilidades de los
+        segmentos, como con RoBERTa en los cuadernos) o 'vote' (proporción de segmentos de cada etiqueta,
+        como el voto mayoritario de FinBERT).
+        Los segmentos repetidos se puntúan una sola vez. Con una `cache` (fomc_score_cache.ScoreCache)
+        solo se tokenizan y puntúan los segmentos que no estén ya guardados para este modelo y revisión.
+        '''
+        if len(texts) == 0:
+            return
+        segments, doc_index = self.segment(texts)
+        counts = np.bincount(doc_index, minlength=len(texts))
+        remaining = counts.copy()
+        totals = np.zeros((len(texts), len(self.labels)), dtype=np.float64)
+        positions = {}
+        for position, segment in enumerate(segments):
+            positions.setdefault(segment_key(segment), []).append(position)
+
+        def add(key, probs):
+            if aggregate == 'vote':
+                probs = np.eye(len(self.labels))[np.argmax(probs)]
+            docs = doc_index[positions.pop(key)]
+            np.add.at(totals, docs, probs)
+            np.subtract.at(remaining, docs, 1)
+            return [int(doc) for doc in np.unique(docs) if remaining[doc] == 0]
+
+        if cache is not None:
+            for key, probs in cache.get_many(self.model_name, self.revision, list(positions)).items():
+                for doc in add(key, probs):
+                    yield doc, totals[doc] / counts[doc]
+
+        pending = list(positions)
+        if not pending:
+            return
+        input_ids = [segments[positions[key][0]] for key in pending]
+        for batch, probs in self.score_segments(input_ids):
+            keys = [pending[i] for i in batch]
+            if cache is not None:
+                cache.put_many(self.model_name, self.revision, zip(keys, probs))
+            for key, key_probs in zip(keys, probs):
+                for doc in add(key, key_probs):
+                    yield doc, totals[doc] / counts[doc]
+
+    def score_df(self, df, text_col='text', aggregate='mean', prefix=None, cache=None):
+        '''
+        Puntúa la columna `text_col` de `df` y devuelve un DataFrame con el mismo índice, la probabilidad de
+        cada etiqueta (<prefix>_<etiqueta>), la etiqueta más probable (<prefix>) y su probabilidad (<prefix>_proba)
+        '''
+        import pandas as pd
+        prefix = prefix or self.model_name.split('/')[-1]
+        probs = np.zeros((len(df), len(self.labels)))
+        for doc, doc_probs in self.score(list(df[text_col]), aggregate, cache):
+            probs[doc] = doc_probs
+        scores = pd.DataFrame(probs, index=df.index, columns=[prefix + '_' + label for label in self.labels])
+        scores[prefix] = [self.labels[i] for i in probs.argmax(axis=1)]
+        scores[prefix + '_proba'] = probs.max(axis=1)
+        return scores
+
+def _notebook_loop(engine, texts):
+    '''
+    Bucle de los cuadernos (un segmento por llamada, con padding=True y max_length=512), solo para el benchmark
+    '''
+    torch = engine.torch
+    results = []
+    for x in texts:
+        segmentos = dividir_texto_en_segmentos(x)
+        sentimientos_segmento = np.zeros((len(engine.labels),), dtype=np.float32)
+        for segmento in segmentos:
+            with torch.no_grad():
+                input_sequence = engine.tokenizer(segmento, return_tensors="pt", padding=True, truncation=True, max_length=512)
+                logits = engine.model(**input_sequence).logits
+                sentimientos_segmento += torch.softmax(logits, dim=1).numpy().squeeze()
+        results.append(sentimientos_segmento / len(segmentos))
+    return results
+
+def _check_segments(texts, tokenizer=None, max_chars=510):
+    '''
+    Comprueba que los segmentos de segment_spans son los de dividir_texto_en_segmentos y, con un `tokenizer`,
+    que segment_input_ids da los mismos identificadores que tokenizar cada segmento por separado
+    '''
+    for text in texts:
+        normalized, spans = segment_spans(text, max_chars)
+        expected = dividir_texto_en_segmentos(text, max_chars) or [""]
+        assert [normalized[start:end] for start, end, _ in spans] == expected
+    if tokenizer is not None:
+        segments, doc_index = segment_input_ids(texts, tokenizer, max_chars)
+        expected = [(tokenizer(segment, truncation=True, max_length=512)['input_ids'], i)
+                    for i, text in enumerate(texts) for segment in dividir_texto_en_segmentos(text, max_chars) or [""]]
+        assert [(ids, int(i)) for ids, i in zip(segments, doc_index)] == expected
+
+def _synthetic_texts(n_texts=40, seed=0):
+    '''
+    Genera textos con la longitud variable de los comunicados, actas y discursos, con saltos de línea
+    y espacios dobles como en los textos descargados
+    '''
+    rng = np.random.RandomState(seed)
+    sentences = ['The Committee decided to maintain the target range for the federal funds rate.',
+                 'Inflation has moved up and remains elevated.',
+                 'Job gains have been robust in recent months, and the unemployment rate has remained low.',
+                 'The Committee is strongly committed to returning inflation to its 2 percent objective.',
+                 'Recent indicators suggest that economic activity has been expanding at a solid pace.']
+    separators = np.array([' ', ' ', ' ', '  ', '\n', '\n\n'])
+    return [''.join(sentence + separator for sentence, separator in
+                    zip(rng.choice(sentences, n), rng.choice(separators, n))).strip()
+            for n in rng.randint(3, 200, n_texts)]
+
+if __name__ == '__main__':
+    # Benchmark: python fomc_sentiment.py [modelo] [nº de textos]
+    model_name = sys.argv[1] if len(sys.argv) > 1 else ROBERTA
+    n_texts = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    texts = _synthetic_texts(n_texts)
+    # Segmentos idénticos a los de los cuadernos, también con una palabra más larga que el segmento y sin texto
+    edge_texts = texts[:3] + ['x' * 600 + ' rates', '', ' \n ']
+    _check_segments(edge_texts)
+    engine = SentimentEngine(model_name)
+    _check_segments(edge_texts, engine.tokenizer)
+
+    legacy_time = timeit.timeit(lambda: _notebook_loop(engine, texts), number=1)
+    start = timeit.default_timer()
+    scores = dict(engine.score(texts))
+    new_time = timeit.default_timer() - start
+
+    legacy = _notebook_loop(engine, texts[:5])
+    for i in range(5):
+        assert np.allclose(legacy[i], scores[i], atol=1e-4)
+    print("{} textos, {} threads".format(n_texts, engine.torch.get_num_threads()))
+    print("Bucle de los cuadernos:  {:.2f} s".format(legacy_time))
+    print("SentimentEngine:         {:.2f} s ({:.1f}x)".format(new_time, legacy_time / new_time))
+
+    # Segunda pasada con la caché de puntuaciones: solo se puntúa un documento nuevo
+    import tempfile
+    from fomc_score_cache import ScoreCache
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ScoreCache(os.path.join(tmp_dir, 'scores.sqlite'))
+        dict(engine.score(texts, cache=cache))
+        new_texts = texts + _synthetic_texts(1, seed=1)
+        cached_time = timeit.timeit(lambda: dict(engine.score(new_texts, cache=cache)), number=1)
+        print("Con caché y 1 documento nuevo:  {:.2f} s".format(cached_time))
+        cache.close()
@@ -0,0 +1,186 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import hashlib
+import timeit
+import json
+import sys
+import os
+
+from fomc_sentiment import length_batches
+
+BART_CNN = 'facebook/bart-large-cnn'
+
+# Modelo de cada proceso del pool, cargado una sola vez por el inicializador
+_worker_summarizer = None
+
+class Summarizer:
+    '''
+    Resumen de documentos con BART en CPU:
+      - cada documento se tokeniza una sola vez, sin truncar
+      - los documentos más largos que el contexto del modelo se dividen en fragmentos que se resumen
+        por separado y cuyos resúmenes se unen en orden
+      - los fragmentos se agrupan en lotes por longitud con un presupuesto de tokens
+    Con los mismos parámetros de generación que 8_reentreno_bart.ipynb (num_beams=5, max_length=400).
+    '''
+    def __init__(self, model_name=BART_CNN, num_threads=None, num_beams=5, max_length=400,
+                 token_budget=8192, max_batch_size=8):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+        self.torch = torch
+        torch.set_num_threads(num_threads or os.cpu_count())
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        self.model.eval()
+        # Contexto del modelo sin los tokens especiales de inicio y fin
+        self.chunk_tokens = self.model.config.max_position_embeddings - 2
+        self.num_beams = num_beams
+        self.max_length = max_length
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+
+    def chunk(self, input_ids):
+        '''
+        Fragmentos de como máximo el contexto del modelo, con sus tokens especiales
+        '''
+        if not input_ids:
+            return [self.tokenizer.build_inputs_with_special_tokens([])]
+        return [self.tokenizer.build_inputs_with_special_tokens(input_ids[start:start + self.chunk_tokens])
+                for start in range(0, len(input_ids), self.chunk_tokens)]
+
+    def summarize(self, texts):
+        '''
+        Resúmenes de `texts`, en el mismo orden. Un documento que falla al generar devuelve None.
+        '''
+        encoded = self.tokenizer(list(texts), add_special_tokens=False)['input_ids']
+        chunks, owners = [], []
+        for doc, input_ids in enumerate(encoded):
+            for chunk in self.chunk(input_ids):
+                chunks.append(chunk)
+                owners.append(doc)
+
+        chunk_summaries = [None] * len(chunks)
+        failed = set()
+        for batch in length_batches([len(chunk) for chunk in chunks], self.token_budget, self.max_batch_size):
+            inputs = self.tokenizer.pad({'input_ids': [chunks[i] for i in batch]}, return_tensors='pt')
+            try:
+                with self.torch.inference_mode():
+                    output = self.model.generate(**inputs, num_beams=self.num_beams, max_length=self.max_length,
+                                                 early_stopping=True)
+            except RuntimeError as e:
+                print("Error al resumir {} fragmentos: {}".format(len(batch), e))
+                failed.update(owners[i] for i in batch)
+                continue
+            for i, summary in zip(batch, self.tokenizer.batch_decode(output, skip_special_tokens=True)):
+                chunk_summaries[i] = summary.strip()
+
+        summaries = [[] for _ in encoded]
+        for doc, summary in zip(owners, chunk_summaries):
+            summaries[doc].append(summary)
+        return [None if doc in failed else " ".join(parts) for doc, parts in enumerate(summaries)]
+
+def text_key(text):
+    '''
+    Clave de un texto en el archivo de progreso
+    '''
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def load_checkpoint(checkpoint_path):
+    '''
+    Resúmenes ya calculados en el archivo de progreso (JSON Lines). Una última línea incompleta
+    por una interrupción se ignora.
+    '''
+    done = {}
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                done[record['key']] = record['summary']
+    return done
+
+def _init_worker(model_name, num_threads, kwargs):
+    global _worker_summarizer
+    _worker_summarizer = Summarizer(model_name, num_threads=num_threads, **kwargs)
+
+def _summarize_unit(keys, texts):
+    return dict(zip(keys, _worker_summarizer.summarize(texts)))
+
+def summarize_corpus(texts, checkpoint_path='data/summaries.jsonl', processes=2, unit_size=8,
+                     model_name=BART_CNN, **kwargs):
+    '''
+    Resume `texts` en `processes` procesos, cada uno con su propia copia del modelo y
+    cpu_count / processes threads. El trabajo se reparte en unidades de `unit_size` documentos y el
+    resultado de cada unidad se añade a `checkpoint_path` en cuanto termina, de modo que una ejecución
+    interrumpida continúa donde lo dejó. Los textos repetidos se resumen una sola vez.
+    Retorna la lista de resúmenes en el orden de `texts` (None si falló la generación).
+    '''
+    keys = [text_key(text) for text in texts]
+    done = load_checkpoint(checkpoint_path)
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in done:
+            pending.setdefault(key, text)
+    print("{} documentos, {} ya resumidos, {} pendientes".format(len(texts), len(texts) - len(pending), len(pending)))
+
+    if pending:
+        if os.path.dirname(checkpoint_path):
+            os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+        pending_keys = list(pending)
+        units = [pending_keys[i:i + unit_size] for i in range(0, len(pending_keys), unit_size)]
+        num_threads = max(1, os.cpu_count() // processes)
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(model_name, num_threads, kwargs)) as executor, \
+                open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+            futures = [executor.submit(_summarize_unit, unit, [pending[key] for key in unit]) for unit in units]
+            for n_done, future in enumerate(as_completed(futures), 1):
+                summaries = future.result()
+                for key, summary in summaries.items():
+                    if summary is not None:
+                        checkpoint.write(json.dumps({'key': key, 'summary': summary}) + '\n')
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+                done.update(summaries)
+                print("Unidad {}/{} completada".format(n_done, len(units)))
+    return [done.get(key) for key in keys]
+
+def summarize_df(df, text_col='text', checkpoint_path='data/summaries.jsonl', processes=2, **kwargs):
+    '''
+    Añade a una copia de `df` la columna 'summary' con el resumen de `text_col`
+    '''
+    new_df = df.copy()
+    new_df['summary'] = summarize_corpus(list(df[text_col]), checkpoint_path, processes, **kwargs)
+    return new_df
+
+def _notebook_loop(texts):
+    '''
+    Bucle de 8_reentreno_bart.ipynb (pipeline por fila, tokenizando dos veces), solo para el benchmark
+    '''
+    from transformers import BartTokenizer, pipeline
+    tokenizer = BartTokenizer.from_pretrained(BART_CNN)
+    summarizer = pipeline("summarization", model=BART_CNN)
+    summaries = []
+    for text in texts:
+        tokenizer(text, return_tensors="pt", truncation=True)
+        summaries.append(summarizer(text, truncation=True, max_length=400, num_beams=5, early_stopping=True)[0]["summary_text"])
+    return summaries
+
+if __name__ == '__main__':
+    # Benchmark: python fomc_summarize.py [nº de textos] [procesos]
+    import tempfile
+    from fomc_sentiment import _synthetic_texts
+    n_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    texts = _synthetic_texts(n_texts)
+
+    legacy_time = timeit.timeit(lambda: _notebook_loop(texts), number=1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checkpoint_path = os.path.join(tmp_dir, 'summaries.jsonl')
+        new_time = timeit.timeit(lambda: summarize_corpus(texts, checkpoint_path, processes), number=1)
+        resume_time = timeit.timeit(lambda: summarize_corpus(texts, checkpoint_path, processes), number=1)
+    print("{} textos".format(n_texts))
+    print("Bucle del cuaderno:             {:.1f} s".format(legacy_time))
+    print("summarize_corpus ({} procesos):  {:.1f} s ({:.1f}x)".format(processes, new_time, legacy_time / new_time))
+    print("Reanudación con todo resumido:  {:.2f} s".format(resume_time))
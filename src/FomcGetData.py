@@ -1,34 +1,103 @@
-from datetime import date
-import numpy as np
-import pandas as pd
-import pickle
+from concurrent.futures import ThreadPoolExecutor
+import time
 import sys
 
-# Importar las clases que manejan los diferentes tipos de datos del FOMC
-from fomc_get_data.FomcStatement import FomcStatement
-from fomc_get_data.FomcMinutes import FomcMinutes
-from fomc_get_data.FomcMeetingScript import FomcMeetingScript
-from fomc_get_data.FomcPresConfScript import FomcPresConfScript
-from fomc_get_data.FomcSpeech import FomcSpeech
-from fomc_get_data.FomcTestimony import FomcTestimony
+# Solo se importa el extractor del tipo de contenido pedido (ver fomc_get_data/__init__.py)
+from fomc_get_data import SCRAPERS, get_scraper
 
-def download_data(fomc, from_year):
+def download_data(fomc, from_year, incremental=False, save_pickle=False):
     '''
     Función para descargar datos de un tipo específico de contenido del FOMC para un rango de años.
-    Guarda el DataFrame descargado como un archivo pickle y los textos como archivos de texto plano.
+    Guarda el DataFrame descargado en el almacén columnar del corpus y los textos como archivos de texto plano.
+    Con `incremental`, solo se descargan los documentos nuevos o modificados desde la última ejecución.
+    Con `save_pickle`, también se guarda el archivo pickle que leen los notebooks antiguos.
     '''
     # Obtener el DataFrame con los contenidos del FOMC para el rango de años especificado
-    df = fomc.get_contents(from_year)
+    if incremental:
+        df = fomc.update_contents(from_year)
+    else:
+        df = fomc.get_contents(from_year)
     print("Shape of the downloaded data: ", df.shape)
     print("The first 5 rows of the data: \n", df.head())
     print("The last 5 rows of the data: \n", df.tail())
 
-    # Guardar el DataFrame como un archivo pickle
-    fomc.pickle_dump_df(filename=fomc.content_type + ".pickle")
+    # Guardar el DataFrame en el almacén columnar (particionado por tipo y año)
+    fomc.save_corpus()
+    if save_pickle:
+        fomc.pickle_dump_df(filename=fomc.content_type + ".pickle")
 
     # Guardar los textos como archivos de texto plano en una carpeta específica
     fomc.save_texts(prefix=fomc.content_type + "/FOMC_" + fomc.content_type + "_")
 
+def download_all(from_year, incremental=False, save_pickle=False, max_threads=10, base_dir='../data/FOMC/'):
+    '''
+    Descarga coordinada de los seis tipos de contenido. Todos comparten un único motor de descarga,
+    de modo que las páginas índice comunes (fomccalendars.htm, fomchistorical{year}.htm) se descargan
+    y analizan una sola vez, y las fases de artículos corren en paralelo bajo un presupuesto global
+    de `max_threads` descargas simultáneas. Informa del tiempo total de cada tipo.
+    '''
+    from fomc_get_data.FomcFetcher import FomcFetcher
+    from fomc_get_data.FomcCache import FomcCache
+    fetcher = FomcFetcher(max_threads=max_threads, cache=FomcCache(base_dir + 'http_cache/'))
+    fomcs = [get_scraper(content_type)(max_threads=max_threads, base_dir=base_dir) for content_type in SCRAPERS]
+    for fomc in fomcs:
+        fomc.use_fetcher(fetcher)
+
+    def timed_download(fomc):
+        start_time = time.perf_counter()
+        download_data(fomc, from_year, incremental, save_pickle)
+        return time.perf_counter() - start_time
+
+    with ThreadPoolExecutor(max_workers=len(fomcs)) as executor:
+        elapsed = list(executor.map(timed_download, fomcs))
+    fetcher.close()
+
+    fetcher.report()
+    for fomc, seconds in zip(fomcs, elapsed):
+        print("{}: {:.1f} s".format(fomc.content_type, seconds))
+
+def _import_time(code, repeat=5):
+    '''
+    Menor tiempo de importación (ms, según -X importtime) de `code` en un intérprete nuevo
+    '''
+    import subprocess
+    times = []
+    for _ in range(repeat):
+        stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                capture_output=True, text=True, check=True).stderr
+        # Solo las importaciones de primer nivel: su tiempo acumulado incluye el de las anidadas
+        times.append(sum(int(line.split('|')[1]) for line in stderr.splitlines()
+                         if line.startswith('import time:') and not line.split('|')[2].startswith('  ')
+                         and line.split('|')[1].strip().isdigit()) / 1000)
+    return min(times)
+
+def import_benchmark(content_type='statement'):
+    '''
+    Compara el arranque de la línea de comandos con las importaciones anteriores (los seis extractores,
+    numpy, pandas, requests, bs4 y textract al cargar el script) y con las diferidas (solo el extractor pedido)
+    '''
+    # Lo que cargaba el script original: FomcCorpus (pyarrow) y FomcCache no existían y no forman parte de la base
+    import importlib.util
+    import subprocess
+    modules = ['numpy', 'pandas', 'pickle', 'requests', 'bs4', 'textract']
+    # textract (y bs4) son opcionales: los que no están instalados se omiten de ambas mediciones
+    missing = [name for name in modules if importlib.util.find_spec(name) is None]
+    if missing:
+        print("Módulos no instalados, omitidos: {}".format(', '.join(missing)))
+    eager = ('import {}; '.format(', '.join(name for name in modules if name not in missing)) +
+             'import fomc_get_data.FomcStatement, fomc_get_data.FomcMinutes, fomc_get_data.FomcMeetingScript, '
+             'fomc_get_data.FomcPresConfScript, fomc_get_data.FomcSpeech, fomc_get_data.FomcTestimony')
+    lazy = 'import FomcGetData; FomcGetData.get_scraper({!r})'.format(content_type)
+    try:
+        eager_time = _import_time(eager)
+        lazy_time = _import_time(lazy)
+    except subprocess.CalledProcessError as error:
+        print("No se pudo medir la importación: {}".format((error.stderr.strip().splitlines() or [str(error)])[-1]))
+        return
+    print("Importaciones al arrancar '{}':".format(content_type))
+    print("  todos los extractores: {:.0f} ms".format(eager_time))
+    print("  solo el pedido:        {:.0f} ms ({:.1f}x)".format(lazy_time, eager_time / lazy_time))
+
 if __name__ == '__main__':
     # Nombre del programa (nombre del script)
     pg_name = sys.argv[0]
@@ -36,14 +105,27 @@ if __name__ == '__main__':
     # Argumentos pasados al script desde la línea de comandos
     args = sys.argv[1:]
 
+    # --incremental: actualizar los datos guardados en lugar de descargarlo todo de nuevo
+    # --pickle: guardar también el archivo pickle por tipo de contenido
+    incremental = '--incremental' in args
+    save_pickle = '--pickle' in args
+    args = [arg for arg in args if arg not in ('--incremental', '--pickle')]
+
+    # --importtime <tipo>: benchmark del tiempo de arranque (python -X importtime)
+    if args and args[0] == '--importtime':
+        import_benchmark(args[1] if len(args) > 1 else 'statement')
+        sys.exit(0)
+
     # Tipos de contenido válidos para descargar
-    content_type_all = ('statement', 'minutes', 'meeting_script', 'presconf_script', 'speech', 'testimony', 'all')
+    content_type_all = tuple(SCRAPERS) + ('all',)
 
     # Validación de los argumentos pasados
     if (len(args) != 1) and (len(args) != 2):
         print("Uso: ", pg_name)
         print("Por favor, especifique el primer argumento de ", content_type_all)
         print("Puede añadir from_year (yyyy) como el segundo argumento.")
+        print("Añada --incremental para descargar solo los documentos nuevos desde la última ejecución.")
+        print("Añada --pickle para guardar también el archivo pickle de cada tipo de contenido.")
         print("\n Usted especificó: ", ','.join(args))
         sys.exit(1)
 
@@ -68,37 +150,9 @@ if __name__ == '__main__':
 
     # Descargar todos los tipos de contenido si se especifica 'all', o solo uno específico
     if content_type == 'all':
-        fomc = FomcStatement()
-        download_data(fomc, from_year)
-
-        fomc = FomcMinutes()
-        download_data(fomc, from_year)
-
-        fomc = FomcMeetingScript()
-        download_data(fomc, from_year)
-
-        fomc = FomcPresConfScript()
-        download_data(fomc, from_year)
-
-        fomc = FomcSpeech()
-        download_data(fomc, from_year)
-
-        fomc = FomcTestimony()
-        download_data(fomc, from_year)
+        download_all(from_year, incremental, save_pickle)
     else:
         # Descargar solo el tipo de contenido especificado
-        if content_type == 'statement':
-            fomc = FomcStatement()
-        elif content_type == 'minutes':
-            fomc = FomcMinutes()
-        elif content_type == 'meeting_script':
-            fomc = FomcMeetingScript()
-        elif content_type == 'presconf_script':
-            fomc = FomcPresConfScript()
-        elif content_type == 'speech':
-            fomc = FomcSpeech()
-        elif content_type == 'testimony':
-            fomc = FomcTestimony()
-
-        download_data(fomc, from_year)
+        fomc = get_scraper(content_type)()
+        download_data(fomc, from_year, incremental, save_pickle)
 
@@ -1,20 +1,109 @@
 import datetime  # Importamos el módulo datetime para trabajar con fechas
 import sys, os  # Importamos los módulos sys y os para manejar argumentos de línea de comandos y operaciones del sistema
-import quandl  # Importamos la biblioteca Quandl para acceder a datos financieros
-import nasdaqdatalink  # Importamos un módulo llamado nasdaqdatalink (suponemos que es personalizado)
+import time  # Para medir el tiempo total de la actualización
+from concurrent.futures import ThreadPoolExecutor  # Pool de threads para descargar las series en paralelo
+import pandas as pd  # Para leer y filtrar las series guardadas
 
-def download_data(quandl_code, from_date):
+class NasdaqDataLinkSource:
+    """
+    Fuente de datos por defecto: descarga las series con nasdaqdatalink.
+    Cualquier objeto con un método `get(code, start_date)` que devuelva un DataFrame indexado por fecha
+    puede sustituirla (por ejemplo, `FixtureSource` en las pruebas).
+    """
+    def __init__(self, api_key=None):
+        import nasdaqdatalink  # Se importa aquí para que las fuentes alternativas no dependan de nasdaqdatalink
+        if api_key:
+            nasdaqdatalink.ApiConfig.api_key = api_key  # Configuramos la clave de la API
+        self.client = nasdaqdatalink
+
+    def get(self, code, start_date):
+        return self.client.get(code, start_date=start_date)
+
+class FixtureSource:
+    """
+    Fuente de datos local: lee cada serie de `<fixture_dir>/<code con / sustituido por _>.csv`,
+    con el mismo formato que escribe `SeriesStore`. Sirve para pruebas sin acceso a la red.
+    """
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+
+    def get(self, code, start_date):
+        df = pd.read_csv(os.path.join(self.fixture_dir, code.replace("/", "_") + ".csv"), index_col=0, parse_dates=True)
+        return df.loc[df.index >= pd.Timestamp(start_date)]
+
+class SeriesStore:
+    """
+    Almacén local de series: un CSV por código en `data_dir`, al que solo se añaden las filas nuevas.
+    """
+    def __init__(self, data_dir=os.path.join("..", "data", "MarketData", "Quandl")):
+        self.data_dir = data_dir
+
+    def path(self, code):
+        return os.path.join(self.data_dir, code.replace("/", "_") + ".csv")
+
+    def last_date(self, code):
+        """
+        Fecha de la última observación guardada para `code`, o None si no hay datos.
+        Solo se lee el final del archivo, no la serie completa.
+        """
+        filepath = self.path(code)
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - 4096, 0))  # La última línea cabe de sobra en los últimos 4 KB
+            lines = f.read().decode("utf-8").strip().splitlines()
+        if not lines or (size <= 4096 and len(lines) < 2):  # Archivo vacío o solo con la cabecera
+            return None
+        return pd.Timestamp(lines[-1].split(",")[0])
+
+    def append(self, code, df):
+        """
+        Añade al CSV de `code` las filas de `df` posteriores a la última observación guardada.
+        Devuelve el número de filas añadidas.
+        """
+        filepath = self.path(code)
+        last_date = self.last_date(code)
+        if last_date is None:
+            os.makedirs(self.data_dir, exist_ok=True)
+            df.to_csv(filepath)
+            return len(df)
+        df = df.loc[df.index > last_date]
+        if len(df) > 0:
+            # Mismo orden de columnas que la cabecera del archivo existente
+            columns = pd.read_csv(filepath, index_col=0, nrows=0).columns
+            df.reindex(columns=columns).to_csv(filepath, mode="a", header=False)
+        return len(df)
+
+def download_data(quandl_code, from_date, store=None, source=None):
     """
     Función para descargar datos desde Quandl para un código dado y a partir de una fecha especificada.
-    Guarda los datos descargados en un archivo CSV y muestra información resumida sobre los datos descargados.
+    Si la serie ya está guardada, solo se piden las observaciones posteriores a la última guardada,
+    y se añaden al CSV existente en lugar de reescribirlo.
     """
-    print("Descargando: [{}]".format(quandl_code))
-    df = nasdaqdatalink.get(quandl_code, start_date=from_date)  # Llamamos a una función para obtener los datos usando nasdaqdatalink
-    print("Forma de los datos descargados: ", df.shape)  # Mostramos la forma (número de filas y columnas) de los datos descargados
-    print("Primeras 5 filas de los datos: \n", df.head())  # Mostramos las primeras 5 filas de los datos descargados
-    print("Últimas 5 filas de los datos: \n", df.tail())  # Mostramos las últimas 5 filas de los datos descargados
-    # Guardamos los datos en un archivo CSV en la carpeta ../data/MarketData/Quandl/
-    df.to_csv(os.path.join("..", "data", "MarketData", "Quandl", quandl_code.replace("/", "_")+".csv"))
+    store = store or SeriesStore()
+    source = source or NasdaqDataLinkSource()
+    last_date = store.last_date(quandl_code)  # Última observación guardada, si existe
+    start_date = from_date
+    if last_date is not None:
+        start_date = max(pd.Timestamp(from_date), last_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+    print("Descargando: [{}] desde {}".format(quandl_code, start_date))
+    df = source.get(quandl_code, start_date)  # Llamamos a la fuente de datos para obtener solo las filas nuevas
+    n_rows = store.append(quandl_code, df)  # Añadimos las filas nuevas al CSV en ../data/MarketData/Quandl/
+    print("[{}]: {} filas nuevas".format(quandl_code, n_rows))
+    return n_rows
+
+def download_all(quandl_codes, from_date, store=None, source=None, max_workers=8):
+    """
+    Descarga concurrentemente todas las series de `quandl_codes`, cada una de forma incremental.
+    """
+    store = store or SeriesStore()
+    source = source or NasdaqDataLinkSource()
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        n_rows = list(executor.map(lambda code: download_data(code, from_date, store, source), quandl_codes))
+    print("{} series, {} filas nuevas en {:.1f} s".format(len(quandl_codes), sum(n_rows), time.perf_counter() - start_time))
+    return dict(zip(quandl_codes, n_rows))
 
 if __name__ == '__main__':
     pg_name = sys.argv[0]  # Nombre del programa obtenido de los argumentos de la línea de comandos
@@ -35,8 +124,8 @@ if __name__ == '__main__':
         all_data = True  # Si se proporcionaron 2 argumentos, se descargan todos los datos
     else:
         all_data = False  # Si se proporcionaron 3 argumentos, se descarga un código específico
+        quandl_code = args[2]  # Código de Quandl obtenido del tercer argumento
 
-    quandl.ApiConfig.api_key = args[0]  # Configuramos la clave de la API de Quandl usando el primer argumento
     from_date = args[1]  # Fecha de inicio obtenida del segundo argumento
 
     try:
@@ -45,13 +134,12 @@ if __name__ == '__main__':
         print("from_date debe estar en formato yyyy-mm-dd. Has proporcionado: ", from_date)
         sys.exit(1)  # Salimos del programa con código de error 1 si la fecha no es válida
 
+    source = NasdaqDataLinkSource(api_key=args[0])  # Configuramos la clave de la API usando el primer argumento
+    store = SeriesStore()
+
     if all_data:
-        # Descargamos todos los conjuntos de datos en las tuplas fred_all e ism_all, y los rendimientos del Tesoro
-        for dataset_code in fred_all:
-            download_data("FRED/" + dataset_code, from_date)
-        for dataset_code in ism_all:
-            download_data("ISM/" + dataset_code, from_date)
-        download_data(treasury_code, from_date)
+        # Descargamos concurrentemente todos los conjuntos de datos en las tuplas fred_all e ism_all, y los rendimientos del Tesoro
+        codes = ["FRED/" + dataset_code for dataset_code in fred_all] + ["ISM/" + dataset_code for dataset_code in ism_all] + [treasury_code]
+        download_all(codes, from_date, store, source)
     else:
-        download_data(quandl_code, from_date)  # Descargamos solo el conjunto de datos especificado por el código de Quandl
-
+        download_data(quandl_code, from_date, store, source)  # Descargamos solo el conjunto de datos especificado por el código de Quandl
@@ -0,0 +1,219 @@
+from collections import namedtuple
+import timeit
+import os
+
+import numpy as np
+import pandas as pd
+
+# Regla de publicación de una serie macroeconómica: prefijo de las columnas generadas, columna del
+# valor en la serie, periodos por año (para diff_year) y desfase de publicación en meses y días.
+# Un dato del periodo `t` está disponible en una fecha `d` si `d > t + months + days`.
+ReleaseRule = namedtuple('ReleaseRule', ['prefix', 'value_col', 'periods_per_year', 'months', 'days'])
+
+RELEASE_RULES = (
+    # El PIB se anuncia trimestralmente, a finales del mes siguiente (preliminar)
+    ReleaseRule('GDP', 'GDPC1', 4, 4, -2),
+    # El PIB potencial se anuncia trimestralmente, a finales del mes siguiente (preliminar)
+    ReleaseRule('GDPPOT', 'GDPPOT', 4, 4, -2),
+    # El gasto en consumo personal se anuncia mensualmente, a finales del mes siguiente
+    ReleaseRule('PCE', 'PCEPILFE', 12, 2, -1),
+    # El IPC se anuncia mensualmente, alrededor del día 10 del mes siguiente
+    ReleaseRule('CPI', 'CPIAUCSL', 12, 1, 9),
+    # Las estadísticas de empleo se anuncian mensualmente, alrededor del día 3 del mes siguiente
+    ReleaseRule('Unemp', 'UNRATE', 12, 1, 2),
+    ReleaseRule('Employ', 'PAYEMS', 12, 1, 2),
+    # Las ventas minoristas se anuncian mensualmente, alrededor del día 15 del mes siguiente
+    ReleaseRule('Rsales', 'RRSFS', 12, 1, 2),
+    # Las ventas de nuevas viviendas se anuncian mensualmente, aproximadamente una semana antes del final del mes siguiente
+    ReleaseRule('Hsales', 'HSN1F', 12, 1, 2)
+)
+RULES_BY_COL = {rule.value_col: rule for rule in RELEASE_RULES}
+
+TAYLOR_COLUMNS = ['Taylor', 'Balanced', 'Inertia', 'Taylor-Rate', 'Balanced-Rate', 'Inertia-Rate']
+
+def prepare_series(series, value_col, periods_per_year):
+    '''
+    Convierte una serie (Series o DataFrame de una columna indexado por fecha) al formato que usan
+    las uniones: columnas `value_col`, `diff_prev` y `diff_year` (variaciones en %)
+    '''
+    df = series.to_frame(value_col) if isinstance(series, pd.Series) else series.set_axis([value_col], axis=1)
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index()
+    df['diff_prev'] = df[value_col].diff() / df[value_col].shift(1) * 100
+    df['diff_year'] = df[value_col].diff(periods=periods_per_year) / df[value_col].shift(periods_per_year) * 100
+    return df
+
+def read_quandl_series(value_col, data_dir=os.path.join("..", "data", "MarketData", "Quandl")):
+    '''
+    Lee una serie FRED guardada por QuandlGetData (`FRED_<value_col>.csv`) y la prepara con `prepare_series`
+    '''
+    df = pd.read_csv(os.path.join(data_dir, "FRED_" + value_col + ".csv"), index_col=0, parse_dates=True)
+    return prepare_series(df.iloc[:, :1], value_col, RULES_BY_COL[value_col].periods_per_year)
+
+def release_dates(index, months, days):
+    '''
+    Fechas de publicación de los periodos de `index`: se suman primero los meses (ajustando al último
+    día del mes, como `relativedelta`) y después los días, de forma vectorizada
+    '''
+    index = pd.DatetimeIndex(index)
+    if months:
+        index = index + pd.DateOffset(months=months)
+    return index + pd.Timedelta(days=days)
+
+def asof_join(dates, index_df, months, days, columns=None):
+    '''
+    Para cada fecha de `dates`, la fila más reciente de `index_df` ya publicada en esa fecha
+    (fecha de publicación estrictamente anterior). Devuelve un DataFrame alineado con `dates`,
+    con la fecha del periodo en la columna `date` y NaN/NaT donde aún no hay datos publicados.
+    Es una búsqueda binaria sobre las fechas de publicación: O((n + m) log m) en lugar de O(n × m).
+    '''
+    index_df = index_df.sort_index(kind='mergesort')
+    columns = list(index_df.columns) if columns is None else list(columns)
+    published = release_dates(index_df.index, months, days).values
+    positions = np.searchsorted(published, pd.DatetimeIndex(dates).values, side='left') - 1
+    valid = positions >= 0
+    taken = np.where(valid, positions, 0)
+
+    result = pd.DataFrame(index=pd.RangeIndex(len(positions)))
+    result['date'] = np.where(valid, index_df.index.values[taken], np.datetime64('NaT'))
+    for column in columns:
+        values = index_df[column].values.astype(float)[taken]
+        values[~valid] = np.nan
+        result[column] = values
+    return result
+
+def get_available_latest(train_df, index_df, value_col, diff_prev_col, diff_year_col, date_offset):
+    '''
+    Versión vectorizada de `get_available_latest` de 2_analisis_inicial_notextuales.ipynb, con la misma
+    firma y salidas: fecha, valor, diferencia con el periodo anterior y con el mismo periodo del año anterior
+    del índice más reciente disponible para cada fila de `train_df`.
+    `date_offset` es el `relativedelta` (meses y días) entre el periodo y su publicación.
+    '''
+    joined = asof_join(train_df.index, index_df, date_offset.years * 12 + date_offset.months, date_offset.days,
+                       [value_col, diff_prev_col, diff_year_col])
+    return joined['date'].values, joined[value_col].values, joined[diff_prev_col].values, joined[diff_year_col].values
+
+def add_market_data(calendar_df, series, window=1, rules=RELEASE_RULES):
+    '''
+    Añade al calendario los datos de mercado más recientes disponibles en cada reunión, con un promedio
+    móvil de `window` periodos. `series` es un diccionario {value_col: DataFrame de `prepare_series`}.
+    Por cada regla se añaden las columnas <prefix>_date, <prefix>_value, <prefix>_diff_prev y <prefix>_diff_year.
+    Las filas sin `Rate` (la respuesta) se eliminan.
+    '''
+    df = calendar_df.copy(deep=True)
+    df.dropna(subset=['Rate'], inplace=True)
+    for rule in rules:
+        joined = asof_join(df.index, series[rule.value_col].rolling(window).mean(), rule.months, rule.days,
+                           [rule.value_col, 'diff_prev', 'diff_year'])
+        df[rule.prefix + '_date'] = joined['date'].values
+        df[rule.prefix + '_value'] = joined[rule.value_col].values
+        df[rule.prefix + '_diff_prev'] = joined['diff_prev'].values
+        df[rule.prefix + '_diff_year'] = joined['diff_year'].values
+    return df
+
+def taylor_rules(fedrate_df, series):
+    '''
+    Calcula cada día de `fedrate_df` (columna `Rate`) las reglas de Taylor, Balanced-approach e Inertia
+    con el PIB, el PIB potencial y la inflación PCE disponibles ese día, y sus desviaciones respecto a `Rate`
+    '''
+    taylor = fedrate_df.copy(deep=True)
+    gdp, gdppot, pce = RULES_BY_COL['GDPC1'], RULES_BY_COL['GDPPOT'], RULES_BY_COL['PCEPILFE']
+    y = asof_join(taylor.index, series['GDPC1'], gdp.months, gdp.days, ['GDPC1'])['GDPC1'].values
+    yp = asof_join(taylor.index, series['GDPPOT'], gdppot.months, gdppot.days, ['GDPPOT'])['GDPPOT'].values
+    pi = asof_join(taylor.index, series['PCEPILFE'], pce.months, pce.days, ['diff_year'])['diff_year'].values
+
+    # Diferencia logarítmica entre Y e Yp (en miles de millones) en porcentaje, con inflación objetivo y r del 2%
+    y_gap = (np.log(y * 10**9) - np.log(yp * 10**9)) * 100
+    pi_gap = pi - 2
+    taylor['Taylor'] = 2 + pi + 0.5 * pi_gap + 0.5 * y_gap
+    taylor['Balanced'] = np.maximum(2 + pi + 0.5 * pi_gap + y_gap, 0)
+    taylor['Inertia'] = 0.85 * taylor['Rate'] - 0.15 * taylor['Balanced']
+    taylor = taylor.drop(columns=['diff'], errors='ignore')
+
+    # Desviación respecto a Rate, que puede provocar el cambio de tipos
+    taylor['Taylor-Rate'] = taylor['Taylor'] - taylor['Rate']
+    taylor['Balanced-Rate'] = taylor['Balanced'] - taylor['Rate']
+    taylor['Inertia-Rate'] = taylor['Inertia'] - taylor['Rate']
+    taylor['Taylor_diff'] = taylor['Taylor'].diff(1)
+    taylor['Balanced_diff'] = taylor['Balanced'].diff(1)
+    taylor['Inertia_diff'] = taylor['Inertia'].diff(1)
+    return taylor
+
+def add_taylor(df, taylor, window=1):
+    '''
+    Añade a `df` (indexado por fecha de reunión) las reglas de `taylor_rules` del día anterior a cada reunión,
+    con un promedio móvil de `window` días. Las fechas sin dato quedan como NaN.
+    '''
+    taylor_ma = taylor[TAYLOR_COLUMNS].rolling(window).mean()
+    taylor_ma = taylor_ma[~taylor_ma.index.duplicated(keep='first')]
+    previous_day = taylor_ma.reindex(pd.DatetimeIndex(df.index) - pd.Timedelta(days=1))
+    for column in TAYLOR_COLUMNS:
+        df[column] = previous_day[column].values
+    df['Taylor_diff'] = df['Taylor'].diff(1)
+    df['Balanced_diff'] = df['Balanced'].diff(1)
+    df['Inertia_diff'] = df['Inertia'].diff(1)
+    return df
+
+def _legacy_get_available_latest(train_df, index_df, value_col, diff_prev_col, diff_year_col, date_offset):
+    '''
+    Implementación original del cuaderno (doble bucle con iterrows), solo para el benchmark
+    '''
+    date_list, value_list, diff_prev_list, diff_year_list = [], [], [], []
+    for i, row_data in train_df.iterrows():
+        not_available = True
+        for j, row_index in index_df.sort_index(ascending=False).iterrows():
+            if row_data.name > row_index.name + date_offset:
+                date_list.append(row_index.name)
+                value_list.append(row_index[value_col])
+                diff_prev_list.append(row_index[diff_prev_col])
+                diff_year_list.append(row_index[diff_year_col])
+                not_available = False
+                break
+        if not_available:
+            date_list.append(None)
+            value_list.append(None)
+            diff_prev_list.append(None)
+            diff_year_list.append(None)
+    return date_list, value_list, diff_prev_list, diff_year_list
+
+def _synthetic_data(seed=0):
+    '''
+    Genera un calendario de reuniones, un tipo objetivo diario y las series macroeconómicas de RELEASE_RULES
+    '''
+    rng = np.random.RandomState(seed)
+    days = pd.date_range('1980-01-01', '2020-12-31', freq='D')
+    fedrate_df = pd.DataFrame({'Rate': np.round(np.cumsum(rng.normal(0, 0.02, len(days))) + 5, 2)}, index=days)
+    fedrate_df['diff'] = fedrate_df['Rate'].diff()
+    calendar = pd.DataFrame(index=pd.DatetimeIndex(np.sort(rng.choice(days[400:], 330, replace=False))))
+    calendar['Rate'] = fedrate_df['Rate'].reindex(calendar.index).values
+    series = {}
+    for rule in RELEASE_RULES:
+        freq = 'QS' if rule.periods_per_year == 4 else 'MS'
+        index = pd.date_range('1970-01-01', '2020-12-31', freq=freq)
+        series[rule.value_col] = prepare_series(pd.Series(1000 + np.cumsum(rng.normal(1, 5, len(index))), index=index),
+                                                rule.value_col, rule.periods_per_year)
+    return calendar, fedrate_df, series
+
+if __name__ == '__main__':
+    # Benchmark: características de mercado de 330 reuniones frente al doble bucle original
+    from dateutil.relativedelta import relativedelta
+    calendar, fedrate_df, series = _synthetic_data()
+    rule = RULES_BY_COL['PAYEMS']
+    offset = relativedelta(months=+rule.months, days=+rule.days)
+    legacy = _legacy_get_available_latest(calendar, series['PAYEMS'], 'PAYEMS', 'diff_prev', 'diff_year', offset)
+    new = get_available_latest(calendar, series['PAYEMS'], 'PAYEMS', 'diff_prev', 'diff_year', offset)
+    assert np.array_equal(pd.DatetimeIndex(legacy[0]).values, new[0])
+    for legacy_values, new_values in zip(legacy[1:], new[1:]):
+        assert np.allclose(np.array(legacy_values, dtype=float), new_values, equal_nan=True)
+
+    legacy_time = min(timeit.repeat(lambda: _legacy_get_available_latest(calendar, series['PAYEMS'], 'PAYEMS', 'diff_prev', 'diff_year', offset), number=1, repeat=3))
+    new_time = min(timeit.repeat(lambda: get_available_latest(calendar, series['PAYEMS'], 'PAYEMS', 'diff_prev', 'diff_year', offset), number=1, repeat=3))
+    print("{} reuniones, {} observaciones mensuales".format(len(calendar), len(series['PAYEMS'])))
+    print("Una serie, original:     {:.3f} s".format(legacy_time))
+    print("Una serie, vectorizada:  {:.4f} s ({:.0f}x)".format(new_time, legacy_time / new_time))
+
+    def build_features():
+        taylor = taylor_rules(fedrate_df, series)
+        return add_taylor(add_market_data(calendar, series), taylor)
+    features_time = min(timeit.repeat(build_features, number=1, repeat=3))
+    print("Todas las series ({}) y reglas de Taylor sobre {} días: {:.3f} s".format(len(RELEASE_RULES), len(fedrate_df), features_time))
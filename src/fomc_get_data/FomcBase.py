@@ -1,24 +1,23 @@
 from datetime import date
+import hashlib
 import re
-import threading
 import pickle
 import sys
 import os
-
-import requests
-from bs4 import BeautifulSoup
-
-import numpy as np
-import pandas as pd
+import asyncio
+from concurrent.futures import Future
 
 from abc import ABCMeta, abstractmethod
 
+from .FomcFetcher import FomcFetcher
+from .FomcCache import FomcCache
+
 class FomcBase(metaclass=ABCMeta):
     '''
     Una clase base para extraer documentos del sitio web del FOMC
     '''
 
-    def __init__(self, content_type, verbose, max_threads, base_dir):
+    def __init__(self, content_type, verbose, max_threads, base_dir, base_url='https://www.federalreserve.gov', use_cache=True):
         
         # Asignar los argumentos a variables internas
         self.content_type = content_type
@@ -26,6 +25,14 @@ class FomcBase(metaclass=ABCMeta):
         self.MAX_THREADS = max_threads
         self.base_dir = base_dir
 
+        # Motor de descarga compartido: pool de workers con sesiones persistentes y caché HTTP en disco
+        cache = FomcCache(base_dir + 'http_cache/') if use_cache else None
+        self.fetcher = FomcFetcher(max_threads=max_threads, verbose=verbose, cache=cache)
+        self.owns_fetcher = True
+
+        # Almacén columnar del corpus, compartido por todos los tipos de contenido (se abre al usarlo)
+        self._corpus = None
+
         # Inicialización de variables
         self.df = None
         self.links = None
@@ -34,18 +41,33 @@ class FomcBase(metaclass=ABCMeta):
         self.speakers = None
         self.titles = None
 
-        # URLs del sitio web del FOMC
-        self.base_url = 'https://www.federalreserve.gov'
+        # URLs del sitio web del FOMC. `base_url` puede apuntar a un servidor local que sirva páginas guardadas
+        self.base_url = base_url
         self.calendar_url = self.base_url + '/monetarypolicy/fomccalendars.htm'
 
-        # Lista de presidentes del FOMC
-        self.chair = pd.DataFrame(
-            data=[["Greenspan", "Alan", "1987-08-11", "2006-01-31"], 
-                  ["Bernanke", "Ben", "2006-02-01", "2014-01-31"], 
-                  ["Yellen", "Janet", "2014-02-03", "2018-02-03"],
-                  ["Powell", "Jerome", "2018-02-05", "2022-02-05"]],
-            columns=["Surname", "FirstName", "FromDate", "ToDate"])
-        
+        # Lista de presidentes del FOMC (se construye al usarla)
+        self._chair = None
+
+    @property
+    def corpus(self):
+        # pyarrow solo se importa cuando se lee o escribe el corpus
+        if self._corpus is None:
+            from .FomcCorpus import FomcCorpus
+            self._corpus = FomcCorpus(self.base_dir + 'corpus/')
+        return self._corpus
+
+    @property
+    def chair(self):
+        if self._chair is None:
+            import pandas as pd
+            self._chair = pd.DataFrame(
+                data=[["Greenspan", "Alan", "1987-08-11", "2006-01-31"], 
+                      ["Bernanke", "Ben", "2006-02-01", "2014-01-31"], 
+                      ["Yellen", "Janet", "2014-02-03", "2018-02-03"],
+                      ["Powell", "Jerome", "2018-02-05", "2022-02-05"]],
+                columns=["Surname", "FirstName", "FromDate", "ToDate"])
+        return self._chair
+
     def _date_from_link(self, link):
         # Extraer la fecha del enlace usando una expresión regular
         date = re.findall('[0-9]{8}', link)[0]
@@ -69,6 +91,47 @@ class FomcBase(metaclass=ABCMeta):
             speaker = "otro"
         return speaker
         
+    def _get(self, url):
+        '''
+        Descarga una URL a través del motor de descarga compartido
+        '''
+        return self.fetcher.get(url)
+
+    def _get_soup(self, url):
+        '''
+        Devuelve una página índice ya analizada, compartida con las demás clases que usan el mismo motor
+        '''
+        return self.fetcher.get_soup(url)
+
+    def use_fetcher(self, fetcher):
+        '''
+        Sustituye el motor de descarga propio por uno compartido entre varios tipos de contenido,
+        de modo que las páginas índice se descarguen una vez y todos compartan el mismo presupuesto de concurrencia.
+        Las estadísticas de rendimiento las informa entonces quien gestiona el motor compartido.
+        '''
+        self.fetcher = fetcher
+        self.owns_fetcher = False
+
+    def _historical_url(self, year):
+        '''
+        URL de la página de archivo del FOMC para un año
+        '''
+        return self.base_url + '/monetarypolicy/fomchistorical' + str(year) + '.htm'
+
+    def _index_urls(self, from_year):
+        '''
+        Devuelve las páginas índice que `_get_links` descarga para `from_year`, para poder
+        descargarlas concurrentemente en modo asíncrono. Las subclases con otros índices la sobrescriben.
+        '''
+        return [self.calendar_url] + [self._historical_url(year) for year in range(from_year, 2015)]
+
+    def _detail_index_urls(self, from_year):
+        '''
+        Devuelve las páginas índice de segundo nivel, cuyas URLs solo se conocen tras analizar las de
+        `_index_urls` (p. ej. una página por conferencia de prensa), para descargarlas también concurrentemente
+        '''
+        return []
+
     @abstractmethod
     def _get_links(self, from_year):
         '''
@@ -97,23 +160,26 @@ class FomcBase(metaclass=ABCMeta):
             print("Obteniendo artículos - Multi-threaded...")
 
         self.articles = ['']*len(self.links)
-        jobs = []
-        # Iniciar y empezar threads:
-        index = 0
-        while index < len(self.links):
-            if len(jobs) < self.MAX_THREADS:
-                t = threading.Thread(target=self._add_article, args=(self.links[index], index,))
-                jobs.append(t)
-                t.start()
-                index += 1
-            else:    # Esperar a que los threads completen y unirlos de vuelta al main thread
-                t = jobs.pop(0)
-                t.join()
-        for t in jobs:
-            t.join()
-
-        #for row in range(len(self.articles)):
-        #    self.articles[row] = self.articles[row].strip()
+        # Un pool acotado de workers; cada artículo se guarda en su índice al terminar
+        if self.owns_fetcher:
+            self.fetcher.reset_stats()
+        self.fetcher.map(self._add_article, self.links)
+        self._resolve_articles()
+        if self.verbose and self.owns_fetcher:
+            self.fetcher.report()
+
+    def _resolve_articles(self):
+        '''
+        Espera los artículos cuyo procesamiento se delegó a otro pool (p. ej. la extracción de texto
+        de PDFs en procesos) y sustituye cada `Future` por su resultado
+        '''
+        for index, article in enumerate(self.articles):
+            if isinstance(article, Future):
+                try:
+                    self.articles[index] = article.result()
+                except Exception as e:
+                    print("\nError procesando {}: {}".format(self.links[index], e))
+                    self.articles[index] = ''
 
     def get_contents(self, from_year=1990):
         '''
@@ -122,16 +188,132 @@ class FomcBase(metaclass=ABCMeta):
         '''
         self._get_links(from_year)
         self._get_articles_multi_threaded()
+        return self._build_df()
+
+    def _build_df(self):
+        '''
+        Construye el DataFrame interno `df` ordenado por fecha a partir de las listas de la instancia
+        '''
+        import pandas as pd
         dict = {
             'date': self.dates,
             'contents': self.articles,
             'speaker': self.speakers, 
-            'title': self.titles
+            'title': self.titles,
+            'link': self.links
         }
         self.df = pd.DataFrame(dict).sort_values(by=['date'])
         self.df.reset_index(drop=True, inplace=True)
         return self.df
 
+    async def get_contents_async(self, from_year=1990, concurrency=10, rate_limit=None):
+        '''
+        Versión asíncrona de `get_contents`: descarga las páginas índice y los artículos en un único
+        event loop, con un semáforo de `concurrency` peticiones y como máximo `rate_limit` peticiones/s por host.
+        Ejemplo de uso:
+            df = asyncio.run(fomc.get_contents_async(2010))
+        '''
+        loop = asyncio.get_running_loop()
+        if self.owns_fetcher:
+            self.fetcher.reset_stats()
+        await self.fetcher.prefetch_async(self._index_urls(from_year), concurrency=concurrency, rate_limit=rate_limit)
+        detail_urls = await loop.run_in_executor(None, self._detail_index_urls, from_year)
+        if detail_urls:
+            await self.fetcher.prefetch_async(detail_urls, concurrency=concurrency, rate_limit=rate_limit)
+        # El análisis de los índices lee las páginas ya descargadas
+        await loop.run_in_executor(None, self._get_links, from_year)
+
+        if self.verbose:
+            print("Obteniendo artículos - Asíncrono...")
+        self.articles = ['']*len(self.links)
+        await self.fetcher.map_async(self._add_article, self.links, url_of=lambda link: self.base_url + link,
+                                     concurrency=concurrency, rate_limit=rate_limit)
+        # Esperar la extracción delegada a otro pool bloquearía el event loop y las descargas de otras corrutinas
+        await loop.run_in_executor(None, self._resolve_articles)
+        if self.verbose and self.owns_fetcher:
+            self.fetcher.report()
+        return self._build_df()
+
+    def update_contents(self, from_year=1990, filename=None):
+        '''
+        Modo incremental de `get_contents`: carga los datos guardados de este tipo de contenido
+        (del almacén columnar `corpus/` o, si se indica `filename`, de ese archivo pickle), compara sus
+        enlaces con los de `_get_links` y descarga solo los artículos nuevos o modificados, que se
+        combinan por fecha con los guardados.
+        Un artículo guardado se considera modificado si su revalidación en la caché HTTP devuelve contenido nuevo.
+        '''
+        if filename is not None:
+            filepath = self.base_dir + filename
+            stored_df = None
+            if os.path.exists(filepath):
+                with open(filepath, "rb") as input_file:
+                    stored_df = pickle.load(input_file)
+        else:
+            filepath = self.corpus.root
+            stored_df = self.corpus.read(types=[self.content_type], columns=['date', 'contents', 'speaker', 'title', 'link'])
+        if stored_df is None or len(stored_df) == 0 or 'link' not in stored_df.columns:
+            print("No hay datos guardados con enlaces en ", filepath, ", se descarga todo")
+            return self.get_contents(from_year)
+
+        self._get_links(from_year)
+        stored_links = set(stored_df['link'])
+        new_indexes = [i for i, link in enumerate(self.links) if link not in stored_links]
+        changed_links = self._get_changed_links([link for link in self.links if link in stored_links])
+        indexes = new_indexes + [i for i, link in enumerate(self.links) if link in changed_links]
+        if self.verbose:
+            print("{} enlaces nuevos y {} modificados para {}".format(len(new_indexes), len(changed_links), self.content_type))
+
+        import pandas as pd
+        if not indexes:
+            # Nada que descargar: se conservan los datos guardados tal cual
+            self.df = stored_df.sort_values(by=['date']).reset_index(drop=True)
+            return self.df
+
+        # Solo se descargan y analizan los artículos nuevos o modificados
+        self.links = [self.links[i] for i in indexes]
+        self.dates = [self.dates[i] for i in indexes]
+        self.speakers = [self.speakers[i] for i in indexes]
+        self.titles = [self.titles[i] for i in indexes]
+        self._get_articles_multi_threaded()
+        new_df = self._build_df()
+
+        self.df = pd.concat([stored_df[~stored_df['link'].isin(set(self.links))], new_df])
+        # La concatenación con un DataFrame de tipo object pierde el tipo datetime que usa `save_texts`
+        self.df['date'] = pd.to_datetime(self.df['date'])
+        self.df = self.df.sort_values(by=['date'])
+        self.df.reset_index(drop=True, inplace=True)
+        return self.df
+
+    def _get_changed_links(self, links):
+        '''
+        Devuelve los enlaces ya guardados cuyo contenido ha cambiado en el sitio web.
+        Sin caché HTTP no hay forma barata de saberlo y se asume que no han cambiado.
+        Los años archivados no se consultan; el resto se revalida con peticiones condicionales
+        y las respuestas nuevas se conservan en el motor de descarga para no repetirlas.
+        Una respuesta 200 con el mismo hash que la versión guardada en la caché no cuenta como cambio
+        (servidores que ignoran las cabeceras condicionales).
+        '''
+        cache = self.fetcher.cache
+        if cache is None:
+            return set()
+        changed_links = set()
+
+        def check_link(link, index):
+            url = self.base_url + link
+            if cache.is_archived(url):
+                return
+            meta = cache.lookup(url)
+            res = self.fetcher.get(url)
+            if getattr(res, 'from_cache', False):
+                return
+            if meta is not None and hashlib.sha256(res.content).hexdigest() == meta['sha256']:
+                return
+            self.fetcher.remember(url, res)
+            changed_links.add(link)
+
+        self.fetcher.map(check_link, links)
+        return changed_links
+
     def pickle_dump_df(self, filename="output.pickle"):
         '''
         Guarda el DataFrame interno `df` en un archivo pickle
@@ -143,22 +325,27 @@ class FomcBase(metaclass=ABCMeta):
         with open(filepath, "wb") as output_file:
             pickle.dump(self.df, output_file)
 
+    def save_corpus(self):
+        '''
+        Guarda el DataFrame interno `df` en el almacén columnar, sustituyendo las particiones de este tipo de contenido
+        '''
+        if self.verbose: print("Escribiendo a ", self.corpus.root + 'type=' + self.content_type)
+        self.corpus.write(self.df, self.content_type)
+
     def save_texts(self, prefix="FOMC_", target="contents"):
         '''
-        Guarda el DataFrame interno `df` en archivos de texto
+        Guarda el DataFrame interno `df` en archivos de texto.
+        Los documentos con la misma fecha se numeran con un sufijo "-2", "-3", ...
         '''
-        tmp_dates = []
-        tmp_seq = 1
-        for i, row in self.df.iterrows():
-            cur_date = row['date'].strftime('%Y-%m-%d')
-            if cur_date in tmp_dates:
-                tmp_seq += 1
+        date_counts = {}
+        for cur_date, text in zip(self.df['date'].dt.strftime('%Y-%m-%d'), self.df[target]):
+            tmp_seq = date_counts.get(cur_date, 0) + 1
+            date_counts[cur_date] = tmp_seq
+            if tmp_seq > 1:
                 filepath = self.base_dir + prefix + cur_date + "-" + str(tmp_seq) + ".txt"
             else:
-                tmp_seq = 1
                 filepath = self.base_dir + prefix + cur_date + ".txt"
-            tmp_dates.append(cur_date)
             if self.verbose: print("Escribiendo a ", filepath)
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
             with open(filepath, "w", encoding="utf-8") as output_file:
-                output_file.write(row[target])
+                output_file.write(text)
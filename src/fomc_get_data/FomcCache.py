@@ -0,0 +1,120 @@
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+import re
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+class FomcCache:
+    '''
+    Caché HTTP persistente en disco para las descargas del sitio web del FOMC.
+    Cada URL tiene una entrada de metadatos (ETag, Last-Modified, hash del contenido) y el
+    contenido se guarda una sola vez, direccionado por su SHA-256.
+    Los documentos de años archivados se sirven directamente desde disco; el resto se
+    revalida con una petición condicional (If-None-Match / If-Modified-Since).
+    Ejemplo de uso:
+        cache = FomcCache('../data/FOMC/http_cache/')
+        fetcher = FomcFetcher(cache=cache)
+    '''
+    def __init__(self, cache_dir, revalidate_years=2):
+        self.cache_dir = cache_dir
+        # Los documentos de los últimos `revalidate_years` años (y los que no tienen año) se revalidan
+        self.revalidate_years = revalidate_years
+        # Las carpetas se crean al guardar la primera respuesta (`_write_atomic`), no al construir la caché
+        self.index_dir = os.path.join(cache_dir, 'index')
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        self._year_regex = re.compile(r'(?<!\d)(19[3-9]\d|20\d\d)')
+
+    def _index_path(self, url):
+        return os.path.join(self.index_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _write_atomic(self, filepath, data):
+        '''
+        Escribe `data` (bytes) en `filepath` mediante un archivo temporal y un rename atómico
+        '''
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        tmp_filepath = "{}.{}.tmp".format(filepath, os.getpid())
+        with open(tmp_filepath, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_filepath, filepath)
+
+    def is_archived(self, url):
+        '''
+        Indica si la URL corresponde a un año archivado, cuyo contenido ya no cambia
+        '''
+        years = self._year_regex.findall(url)
+        if not years:
+            return False
+        return int(years[0]) <= datetime.today().year - self.revalidate_years
+
+    def lookup(self, url):
+        '''
+        Devuelve los metadatos guardados para `url`, o None si no está en caché
+        '''
+        try:
+            with open(self._index_path(url), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._blob_path(meta['sha256'])):
+            return None
+        return meta
+
+    def conditional_headers(self, meta):
+        '''
+        Cabeceras para revalidar una entrada de la caché
+        '''
+        headers = {}
+        if meta is None:
+            return headers
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, res):
+        '''
+        Guarda una respuesta 200 en la caché y devuelve sus metadatos
+        '''
+        content = res.content
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            self._write_atomic(blob_path, content)
+        meta = {
+            'url': url,
+            'sha256': digest,
+            'etag': res.headers.get('ETag'),
+            'last_modified': res.headers.get('Last-Modified'),
+            'content_type': res.headers.get('Content-Type'),
+            'encoding': res.encoding,
+            'fetched_at': datetime.now(timezone.utc).isoformat()
+        }
+        self._write_atomic(self._index_path(url), json.dumps(meta).encode('utf-8'))
+        return meta
+
+    def response(self, meta):
+        '''
+        Reconstruye una `requests.Response` a partir de una entrada de la caché
+        '''
+        res = requests.Response()
+        with open(self._blob_path(meta['sha256']), 'rb') as f:
+            res._content = f.read()
+        res.status_code = 200
+        res.url = meta['url']
+        res.encoding = meta.get('encoding')
+        res.headers = CaseInsensitiveDict()
+        if meta.get('content_type'):
+            res.headers['Content-Type'] = meta['content_type']
+        if meta.get('etag'):
+            res.headers['ETag'] = meta['etag']
+        if meta.get('last_modified'):
+            res.headers['Last-Modified'] = meta['last_modified']
+        res.from_cache = True
+        return res
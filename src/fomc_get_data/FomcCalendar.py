@@ -0,0 +1,211 @@
+from datetime import datetime
+import pickle
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from bs4 import BeautifulSoup
+
+from .FomcFetcher import FomcFetcher
+from .FomcCache import FomcCache
+
+# Encabezado de cada reunión en las páginas de archivo, p. ej. "Enero 31-Febrero 1 Reunión - 1995"
+_HEADING_REGEX = re.compile(r"(Enero|Febrero|Marzo|Abril|Mayo|Junio|Julio|Agosto|Septiembre|Octubre|Noviembre|Diciembre).*\s(\d*-)*(\d+)\s+(Reunión|Conferencias? telefónicas?|\(no programada\))\s-\s(\d+)")
+_MONTH_SHORT_REGEX = re.compile(r".+/(.+)$")
+_DAY_RANGE_REGEX = re.compile(r".+-(.+)$")
+
+# Fechas de los encabezados de archivo que no coinciden con la fecha de la reunión
+_DATE_FIXES = {
+    '1992-Junio-1': '1992-Julio-1',
+    '1995-Enero-1': '1995-Febrero-1',
+    '1998-Junio-1': '1998-Julio-1',
+    '2012-Julio-1': '2012-Agosto-1',
+    '2013-Abril-1': '2013-Mayo-1'
+}
+
+class FomcCalendar:
+    '''
+    Calendario de reuniones del FOMC: descarga en paralelo las páginas de archivo (a través de la
+    caché HTTP) y mantiene una tabla de reuniones ordenada e indexada por fecha, sobre la que las
+    consultas "siguiente/anterior reunión" y "¿es día de reunión?" se resuelven por búsqueda binaria.
+    Ejemplo de uso:
+        calendar = FomcCalendar()
+        df = calendar.get_calendar(1990)      # o calendar.load() para leer el calendario guardado
+        calendar.next_meeting('2019-07-01')
+        calendar.is_meeting_day(df_features.index)
+    '''
+    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/', base_url='https://www.federalreserve.gov'):
+        self.verbose = verbose
+        self.base_dir = base_dir
+        self.base_url = base_url
+        self.calendar_url = self.base_url + '/monetarypolicy/fomccalendars.htm'
+        self.fetcher = FomcFetcher(max_threads=max_threads, verbose=verbose, cache=FomcCache(base_dir + 'http_cache/'))
+
+        self.df = None
+        self._dates = np.array([], dtype='datetime64[ns]')
+
+    def _parse_current(self, soup):
+        '''
+        Obtiene las fechas de reunión de la página actual del calendario (de 2015 en adelante)
+        '''
+        date_list = []
+        panel_divs = soup.find_all('div', {"class": "panel panel-default"})
+
+        for panel_div in panel_divs:
+            m_year = panel_div.find('h4').get_text()[:4]
+            m_months = panel_div.find_all('div', {"class": "fomc-meeting__month"})
+            m_dates = panel_div.find_all('div', {"class": "fomc-meeting__date"})
+            if self.verbose: print("AÑO: {} - {} reuniones encontradas.".format(m_year, len(m_dates)))
+
+            for (m_month, m_date) in zip(m_months, m_dates):
+                month_name = m_month.get_text().strip()
+                date_text = m_date.get_text().strip()
+                is_forecast = False
+                is_unscheduled = False
+                is_month_short = False
+
+                if ("cancelada" in date_text):
+                    continue
+                elif "voto de anotación" in date_text:
+                    date_text = date_text.replace("(voto de anotación)", "").strip()
+                elif "no programada" in date_text:
+                    date_text = date_text.replace("(no programada)", "").strip()
+                    is_unscheduled = True
+
+                if "*" in date_text:
+                    date_text = date_text.replace("*", "").strip()
+                    is_forecast = True
+
+                if "/" in month_name:
+                    month_name = _MONTH_SHORT_REGEX.findall(month_name)[0]
+                    is_month_short = True
+
+                if "-" in date_text:
+                    date_text = _DAY_RANGE_REGEX.findall(date_text)[0]
+
+                meeting_date_str = m_year + "-" + month_name + "-" + date_text
+                if is_month_short:
+                    meeting_date = datetime.strptime(meeting_date_str, '%Y-%b-%d')
+                else:
+                    meeting_date = datetime.strptime(meeting_date_str, '%Y-%B-%d')
+
+                date_list.append({"date": meeting_date, "unscheduled": is_unscheduled, "forecast": is_forecast, "confcall": False})
+        return date_list
+
+    def _parse_historical(self, year, soup):
+        '''
+        Obtiene las fechas de reunión de la página de archivo de un año (anterior a 2015)
+        '''
+        date_list = []
+        if year in (2011, 2012, 2013, 2014):
+            panel_headings = soup.find_all('h5', {"class": "panel-heading"})
+        else:
+            panel_headings = soup.find_all('div', {"class": "panel-heading"})
+        if self.verbose: print("AÑO: {} - {} reuniones encontradas.".format(year, len(panel_headings)))
+        for panel_heading in panel_headings:
+            date_text = panel_heading.get_text().strip()
+            date_text_ext = _HEADING_REGEX.findall(date_text)[0]
+            meeting_date_str = date_text_ext[4] + "-" + date_text_ext[0] + "-" + date_text_ext[2]
+            meeting_date_str = _DATE_FIXES.get(meeting_date_str, meeting_date_str)
+
+            meeting_date = datetime.strptime(meeting_date_str, '%Y-%B-%d')
+            is_confcall = "Conferencia telefónica" in date_text_ext[3]
+            is_unscheduled = "no programada" in date_text_ext[3]
+            date_list.append({"date": meeting_date, "unscheduled": is_unscheduled, "forecast": False, "confcall": is_confcall})
+        return date_list
+
+    def get_calendar(self, from_year=1936):
+        '''
+        Descarga el calendario de reuniones desde `from_year`. Las páginas de archivo de cada año
+        se descargan y analizan en paralelo en el pool del motor de descarga.
+        Retorna el DataFrame ordenado por fecha y lo guarda en la variable interna `df`.
+        Lanza RuntimeError si alguna página no se pudo descargar o analizar, en lugar de devolver
+        un calendario incompleto.
+        '''
+        urls = [self.calendar_url] + [self.base_url + '/monetarypolicy/fomchistorical' + str(year) + '.htm' for year in range(from_year, 2015)]
+        years = [None] + list(range(from_year, 2015))
+        date_lists = [None] * len(urls)
+
+        def add_page(url, index):
+            soup = BeautifulSoup(self.fetcher.get(url).text, 'html.parser')
+            if years[index] is None:
+                date_lists[index] = self._parse_current(soup)
+            else:
+                date_lists[index] = self._parse_historical(years[index], soup)
+
+        self.fetcher.map(add_page, urls)
+        self.fetcher.close()
+        failed = ['calendario actual' if years[index] is None else str(years[index]) for index, meetings in enumerate(date_lists) if meetings is None]
+        if failed:
+            raise RuntimeError("No se pudo obtener el calendario de: " + ", ".join(failed))
+        date_list = [meeting for meetings in date_lists if meetings for meeting in meetings]
+        return self._set_df(pd.DataFrame(date_list, columns=["date", "unscheduled", "forecast", "confcall"]))
+
+    def _set_df(self, df):
+        '''
+        Ordena la tabla de reuniones y construye el índice de fechas para las búsquedas binarias
+        '''
+        self.df = df.sort_values(by=['date'])
+        self.df.reset_index(drop=True, inplace=True)
+        self._dates = pd.to_datetime(self.df['date']).dt.normalize().values.astype('datetime64[ns]')
+        return self.df
+
+    def dump_df(self, filename="fomc_calendar"):
+        '''
+        Guarda el DataFrame interno df en un archivo pickle y csv bajo `base_dir`
+        '''
+        filepath = self.base_dir + filename + '.pickle'
+        print("")
+        print("Escribiendo en ", filepath)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "wb") as output_file:
+            pickle.dump(self.df, output_file)
+        filepath = self.base_dir + filename + '.csv'
+        print("Escribiendo en ", filepath)
+        self.df.to_csv(filepath, index=False)
+
+    def load(self, filename="fomc_calendar"):
+        '''
+        Carga el calendario guardado con `dump_df` sin volver a la red
+        '''
+        with open(self.base_dir + filename + '.pickle', "rb") as input_file:
+            return self._set_df(pickle.load(input_file))
+
+    def _search(self, dates, side, offset):
+        '''
+        Búsqueda binaria de `dates` (escalar o array) en las fechas de reunión.
+        Devuelve la fecha de reunión en la posición encontrada más `offset`, o NaT si no existe.
+        '''
+        is_scalar = np.ndim(dates) == 0
+        values = pd.to_datetime(np.atleast_1d(dates)).normalize().values.astype('datetime64[ns]')
+        positions = np.searchsorted(self._dates, values, side=side) + offset
+        valid = (positions >= 0) & (positions < len(self._dates))
+        result = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[ns]')
+        result[valid] = self._dates[positions[valid]]
+        if is_scalar:
+            return pd.Timestamp(result[0])
+        return pd.DatetimeIndex(result)
+
+    def next_meeting(self, dates, inclusive=True):
+        '''
+        Siguiente reunión en o después de `dates` (estrictamente después si `inclusive` es False)
+        '''
+        return self._search(dates, 'left' if inclusive else 'right', 0)
+
+    def previous_meeting(self, dates, inclusive=True):
+        '''
+        Reunión anterior en o antes de `dates` (estrictamente antes si `inclusive` es False)
+        '''
+        return self._search(dates, 'right' if inclusive else 'left', -1)
+
+    def is_meeting_day(self, dates):
+        '''
+        Indica si `dates` (escalar o array) es un día de reunión
+        '''
+        is_scalar = np.ndim(dates) == 0
+        values = pd.to_datetime(np.atleast_1d(dates)).normalize().values.astype('datetime64[ns]')
+        positions = np.minimum(np.searchsorted(self._dates, values, side='left'), max(len(self._dates) - 1, 0))
+        result = (self._dates[positions] == values) if len(self._dates) else np.zeros(len(values), dtype=bool)
+        return bool(result[0]) if is_scalar else result
@@ -0,0 +1,103 @@
+from functools import reduce
+import operator
+import shutil
+import os
+
+import pandas as pd
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+# Separador entre secciones en la columna `contents`
+SECTION_SEPARATOR = "\n\n[SECTION]\n\n"
+
+class FomcCorpus:
+    '''
+    Almacén columnar (Parquet) del corpus del FOMC, particionado por tipo de contenido y año:
+        <root>/type=statement/year=2019/part-0.parquet
+    Con un esquema estable: date, type, speaker, title, contents, sections, link.
+    La lectura admite proyección de columnas y filtros que se aplican sobre las particiones y las
+    estadísticas de Parquet, por lo que solo se leen las filas y columnas pedidas.
+    Ejemplo de uso:
+        corpus = FomcCorpus('../data/FOMC/corpus/')
+        corpus.write(df, 'statement')
+        df = corpus.read(types=['statement'], since='2010-01-01', columns=['date', 'contents'])
+    '''
+    SCHEMA = pa.schema([
+        ('date', pa.timestamp('ns')),
+        ('type', pa.string()),
+        ('speaker', pa.string()),
+        ('title', pa.string()),
+        ('contents', pa.large_string()),
+        ('sections', pa.list_(pa.large_string())),
+        ('link', pa.string()),
+        ('year', pa.int16())
+    ])
+    PARTITIONING = ds.partitioning(pa.schema([('type', pa.string()), ('year', pa.int16())]), flavor='hive')
+
+    def __init__(self, root='../data/FOMC/corpus/'):
+        self.root = root
+
+    def write(self, df, content_type):
+        '''
+        Sustituye todas las particiones de `content_type` por el contenido de `df`
+        (columnas date, contents, speaker, title y, opcionalmente, link)
+        '''
+        type_dir = os.path.join(self.root, 'type=' + content_type)
+        if os.path.exists(type_dir):
+            shutil.rmtree(type_dir)
+        if len(df) == 0:
+            return
+
+        dates = pd.to_datetime(df['date'])
+        table = pa.table({
+            'date': dates,
+            'type': [content_type] * len(df),
+            'speaker': df['speaker'],
+            'title': df['title'],
+            'contents': df['contents'],
+            'sections': [contents.split(SECTION_SEPARATOR) for contents in df['contents']],
+            'link': df['link'] if 'link' in df.columns else [None] * len(df),
+            'year': dates.dt.year
+        }, schema=self.SCHEMA)
+        os.makedirs(self.root, exist_ok=True)
+        ds.write_dataset(table, self.root, format='parquet', partitioning=self.PARTITIONING,
+                         basename_template='part-{i}.parquet', existing_data_behavior='overwrite_or_ignore')
+
+    def dataset(self, memory_map=False):
+        '''
+        Devuelve el `pyarrow.dataset.Dataset` del corpus. Con `memory_map`, los archivos se leen
+        mediante mmap en lugar de copiarse a memoria (útil para los textos largos de `meeting_script`).
+        '''
+        return ds.dataset(self.root, schema=self.SCHEMA, format='parquet', partitioning=self.PARTITIONING,
+                          filesystem=fs.LocalFileSystem(use_mmap=memory_map))
+
+    def read(self, types=None, since=None, until=None, columns=None, memory_map=False):
+        '''
+        Lee el corpus como un DataFrame ordenado por tipo y fecha.
+        `types` es la lista de tipos de contenido, `since`/`until` los límites (inclusive) de fecha
+        y `columns` las columnas a leer. Los filtros de tipo y año descartan particiones enteras.
+        '''
+        if not os.path.exists(self.root):
+            return pd.DataFrame(columns=columns or self.SCHEMA.names)
+        expressions = []
+        if types is not None:
+            expressions.append(ds.field('type').isin(list(types)))
+        if since is not None:
+            since = pd.Timestamp(since)
+            expressions.append(ds.field('year') >= since.year)
+            expressions.append(ds.field('date') >= pa.scalar(since.to_pydatetime(), pa.timestamp('ns')))
+        if until is not None:
+            until = pd.Timestamp(until)
+            expressions.append(ds.field('year') <= until.year)
+            expressions.append(ds.field('date') <= pa.scalar(until.to_pydatetime(), pa.timestamp('ns')))
+        row_filter = reduce(operator.and_, expressions) if expressions else None
+
+        table = self.dataset(memory_map).to_table(columns=columns, filter=row_filter)
+        df = table.to_pandas()
+        sort_by = [column for column in ('type', 'date') if column in df.columns]
+        if sort_by:
+            df = df.sort_values(by=sort_by)
+        df.reset_index(drop=True, inplace=True)
+        return df
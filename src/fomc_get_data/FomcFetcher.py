@@ -0,0 +1,251 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import threading
+import asyncio
+import time
+import sys
+
+import requests
+from requests.adapters import HTTPAdapter
+
+class FomcFetcher:
+    '''
+    Motor de descarga compartido para las clases Fomc*.
+    Usa un pool acotado de workers, una `requests.Session` por worker (keep-alive) y
+    planificación por orden de finalización, y acumula estadísticas de rendimiento.
+    Ejemplo de uso:
+        fetcher = FomcFetcher(max_threads=10)
+        res = fetcher.get('https://www.federalreserve.gov/monetarypolicy/fomccalendars.htm')
+        fetcher.map(func, links)
+        fetcher.report()
+    Modo asíncrono (un único event loop, semáforo de concurrencia y límite por host):
+        await fetcher.prefetch_async(urls, concurrency=10, rate_limit=5)
+        await fetcher.map_async(func, links, url_of=lambda link: base_url + link)
+    '''
+    def __init__(self, max_threads=10, verbose=True, timeout=60, cache=None):
+        self.max_threads = max_threads
+        self.verbose = verbose
+        self.timeout = timeout
+        # Caché HTTP persistente opcional (FomcCache)
+        self.cache = cache
+
+        # Una sesión por thread: las conexiones se reutilizan entre documentos del mismo worker
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = None
+        # Pool de los modos asíncronos, dimensionado por su `concurrency`
+        self._async_executor = None
+        # Respuestas descargadas por adelantado en modo asíncrono, consumidas por `get`
+        self._prefetched = {}
+        # Páginas índice ya analizadas, compartidas por todas las clases que usan este motor
+        self._soups = {}
+        self._soup_locks = {}
+        self.reset_stats()
+
+    def _session(self):
+        '''
+        Devuelve la sesión del thread actual, creándola si no existe
+        '''
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_threads)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def reset_stats(self):
+        '''
+        Reinicia los contadores de documentos, bytes y tiempo
+        '''
+        with self._lock:
+            self.n_docs = 0
+            self.n_bytes = 0
+            self.n_cached = 0
+            self.start_time = time.perf_counter()
+
+    def get(self, url):
+        '''
+        Descarga `url` con la sesión del thread actual y actualiza las estadísticas.
+        Si la URL ya se descargó con `prefetch_async`, se devuelve esa respuesta.
+        Con caché, los años archivados se sirven desde disco y el resto se revalida.
+        '''
+        res = self._prefetched.pop(url, None)
+        if res is not None:
+            return res
+
+        meta = None
+        headers = {}
+        if self.cache is not None:
+            meta = self.cache.lookup(url)
+            if meta is not None and self.cache.is_archived(url):
+                return self._count(self.cache.response(meta), cached=True)
+            headers = self.cache.conditional_headers(meta)
+
+        res = self._session().get(url, headers=headers, timeout=self.timeout)
+        if self.cache is not None:
+            if res.status_code == 304 and meta is not None:
+                return self._count(self.cache.response(meta), cached=True)
+            if res.status_code == 200:
+                self.cache.store(url, res)
+        return self._count(res, cached=False)
+
+    def get_soup(self, url):
+        '''
+        Descarga y analiza una página índice una sola vez; las llamadas posteriores
+        (desde cualquier thread o tipo de contenido) reciben el mismo objeto BeautifulSoup,
+        que debe tratarse como de solo lectura.
+        '''
+        with self._lock:
+            url_lock = self._soup_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            soup = self._soups.get(url)
+            if soup is None:
+                from bs4 import BeautifulSoup
+                soup = BeautifulSoup(self.get(url).text, 'html.parser')
+                self._soups[url] = soup
+        return soup
+
+    def remember(self, url, res):
+        '''
+        Conserva una respuesta en memoria para que la próxima llamada a `get(url)` no vuelva a la red
+        '''
+        self._prefetched[url] = res
+
+    def _count(self, res, cached):
+        '''
+        Actualiza las estadísticas con una respuesta y la devuelve
+        '''
+        with self._lock:
+            self.n_docs += 1
+            self.n_bytes += len(res.content)
+            if cached:
+                self.n_cached += 1
+        return res
+
+    def _get_executor(self):
+        '''
+        Devuelve el pool de workers, creándolo si no existe
+        '''
+        with self._lock:
+            if self._executor is None:
+                # El pool se mantiene vivo entre llamadas para conservar las sesiones de cada worker
+                self._executor = ThreadPoolExecutor(max_workers=self.max_threads)
+        return self._executor
+
+    def map(self, func, items):
+        '''
+        Ejecuta `func(item, index)` para cada elemento de `items` en el pool de workers.
+        Los resultados se recogen a medida que terminan, no en el orden de envío,
+        por lo que `func` es responsable de guardar su resultado en la posición `index`.
+        '''
+        futures = {self._get_executor().submit(func, item, index): item for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            # Un documento fallido no detiene la descarga del resto
+            try:
+                future.result()
+            except Exception as e:
+                print("\nError descargando {}: {}".format(futures[future], e))
+
+    def _get_async_executor(self, concurrency):
+        '''
+        Devuelve el pool de los modos asíncronos, con al menos `concurrency` workers: las peticiones de
+        `requests` son bloqueantes, así que el pool de `max_threads` limitaría la concurrencia pedida
+        '''
+        with self._lock:
+            if self._async_executor is None or self._async_executor._max_workers < concurrency:
+                if self._async_executor is not None:
+                    self._async_executor.shutdown(wait=False)
+                self._async_executor = ThreadPoolExecutor(max_workers=concurrency)
+        return self._async_executor
+
+    async def _run_limited(self, func, args, url, semaphore, limiter, executor):
+        '''
+        Ejecuta `func(*args)` en `executor` respetando el semáforo y el límite por host de `url`
+        '''
+        async with semaphore:
+            await limiter.wait(urlparse(url).netloc)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, func, *args)
+
+    async def prefetch_async(self, urls, concurrency=10, rate_limit=None):
+        '''
+        Descarga concurrentemente `urls` en un único event loop y las deja en memoria,
+        de modo que las llamadas posteriores a `get` no vuelvan a la red.
+        `rate_limit` es el máximo de peticiones por segundo a un mismo host (None = sin límite).
+        '''
+        semaphore = asyncio.Semaphore(concurrency)
+        limiter = _HostRateLimiter(rate_limit)
+        executor = self._get_async_executor(concurrency)
+        urls = list(dict.fromkeys(urls))
+        responses = await asyncio.gather(*[self._run_limited(self.get, (url,), url, semaphore, limiter, executor) for url in urls])
+        for url, res in zip(urls, responses):
+            self.remember(url, res)
+
+    async def map_async(self, func, items, url_of, concurrency=10, rate_limit=None):
+        '''
+        Equivalente asíncrono de `map`: ejecuta `func(item, index)` para cada elemento
+        bajo un semáforo de concurrencia y un límite de peticiones por host.
+        `url_of(item)` devuelve la URL que descarga `func`, usada para el límite por host.
+        '''
+        semaphore = asyncio.Semaphore(concurrency)
+        limiter = _HostRateLimiter(rate_limit)
+        executor = self._get_async_executor(concurrency)
+        tasks = [self._run_limited(func, (item, index), url_of(item), semaphore, limiter, executor) for index, item in enumerate(items)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Un documento fallido no detiene la descarga del resto
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                print("\nError descargando {}: {}".format(item, result))
+
+    def close(self):
+        '''
+        Cierra los pools de workers
+        '''
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._async_executor is not None:
+            self._async_executor.shutdown(wait=True)
+            self._async_executor = None
+
+    def throughput(self):
+        '''
+        Devuelve (documentos/s, bytes/s) desde el último `reset_stats`
+        '''
+        elapsed = max(time.perf_counter() - self.start_time, 1e-9)
+        return self.n_docs / elapsed, self.n_bytes / elapsed
+
+    def report(self):
+        '''
+        Imprime el rendimiento acumulado en documentos/s y bytes/s
+        '''
+        elapsed = time.perf_counter() - self.start_time
+        docs_per_sec, bytes_per_sec = self.throughput()
+        print("")
+        print("{} documentos ({} desde caché), {:.1f} MB en {:.1f} s - {:.1f} documentos/s, {:.1f} KB/s".format(
+            self.n_docs, self.n_cached, self.n_bytes / 1e6, elapsed, docs_per_sec, bytes_per_sec / 1e3))
+        sys.stdout.flush()
+
+
+class _HostRateLimiter:
+    '''
+    Limita el número de peticiones por segundo a cada host dentro de un event loop
+    '''
+    def __init__(self, rate_limit=None):
+        self.interval = 1.0 / rate_limit if rate_limit else 0.0
+        self._next_slot = {}
+
+    async def wait(self, host):
+        '''
+        Espera hasta el siguiente hueco libre para `host`
+        '''
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        # Sin await entre la lectura y la escritura: el event loop garantiza la atomicidad
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
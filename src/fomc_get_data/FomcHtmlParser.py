@@ -0,0 +1,217 @@
+import timeit
+import json
+import sys
+import os
+import re
+
+from lxml import etree
+
+# Tamaño de los bloques que se entregan al parser; tras el marcador de apéndice no se entregan más
+CHUNK_SIZE = 16384
+
+_FOOTNOTE = re.compile(r'fn\d')
+_APPENDIX = re.compile('(references|appendix)', re.IGNORECASE)
+_SKIP_TAGS = frozenset(['script', 'style'])
+
+class _ParagraphTarget:
+    '''
+    Target de eventos para el parser HTML de lxml (libxml2, en C). Recoge el texto de cada <p>
+    en un solo recorrido, sin construir el árbol del documento:
+      - un párrafo llega hasta el siguiente <p> o hasta el cierre del elemento que lo contiene, aunque falte
+        su </p>; lxml cierra el <p> al abrir un <div>, <table> o <pre>, pero el texto posterior al bloque
+        sigue perteneciendo al párrafo, como con la implementación original
+      - el documento se corta en el primer <b>/<strong> cuyo texto empieza por "references" o "appendix"
+      - los anclajes de notas al pie (<a name="fn1">) se omiten; con `footnotes='parent'` se omite
+        el elemento que los contiene, como hacía `fn.parent.decompose()`
+    '''
+    def __init__(self, cut_appendix=True, footnotes='anchor'):
+        self.cut_appendix = cut_appendix
+        self.footnotes = footnotes
+        self.paragraphs = []
+        self.buffer = None
+        # Profundidad en la pila del elemento que contiene el párrafo en curso
+        self.paragraph_depth = None
+        self.done = False
+        # Pila de elementos abiertos con el estado en que empezaron: (tag, nº de párrafos, longitud del buffer)
+        self.stack = []
+        self.skip_depth = None
+        self.check_marker = False
+
+    def _close_paragraph(self):
+        if self.buffer is not None:
+            self.paragraphs.append(''.join(self.buffer).strip())
+            self.buffer = None
+
+    def start(self, tag, attrib):
+        if self.done:
+            return
+        self.check_marker = self.cut_appendix and tag in ('b', 'strong') and not attrib
+        if tag == 'p' and self.skip_depth is None:
+            self._close_paragraph()
+        self.stack.append((tag, len(self.paragraphs), len(self.buffer) if self.buffer is not None else None))
+        if self.skip_depth is not None:
+            return
+        if tag in _SKIP_TAGS:
+            self.skip_depth = len(self.stack)
+        elif tag == 'a' and self.footnotes and _FOOTNOTE.search(attrib.get('name', '')):
+            # Se descarta lo recogido desde que empezó el elemento a eliminar y se omite hasta su cierre
+            depth = len(self.stack) if self.footnotes == 'anchor' or len(self.stack) == 1 else len(self.stack) - 1
+            _, n_paragraphs, buffer_len = self.stack[depth - 1]
+            del self.paragraphs[n_paragraphs:]
+            if buffer_len is None:
+                self.buffer = None
+            elif self.buffer is not None:
+                del self.buffer[buffer_len:]
+            self.skip_depth = depth
+        elif tag == 'p':
+            self.buffer = []
+            self.paragraph_depth = len(self.stack) - 1
+
+    def end(self, tag):
+        if self.done or not self.stack:
+            return
+        self.stack.pop()
+        self.check_marker = False
+        if self.skip_depth is not None:
+            if len(self.stack) < self.skip_depth:
+                self.skip_depth = None
+            return
+        # No se usa el cierre de </p>: lxml también lo emite al abrir un bloque dentro del párrafo
+        if self.buffer is not None and len(self.stack) < self.paragraph_depth:
+            self._close_paragraph()
+
+    def data(self, data):
+        if self.done:
+            return
+        if self.check_marker and _APPENDIX.match(data):
+            # Marcador de referencias o apéndice: se conserva el párrafo en curso y se ignora el resto
+            self.done = True
+            return
+        self.check_marker = False
+        if self.skip_depth is None and self.buffer is not None:
+            self.buffer.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        self._close_paragraph()
+        return self.paragraphs
+
+def extract_paragraphs(content, encoding=None, cut_appendix=True, footnotes='anchor'):
+    '''
+    Extrae el texto de los párrafos de un artículo HTML del sitio web del FOMC.
+    `content` son los bytes de la respuesta (`res.content`), que se entregan al parser por bloques
+    sin decodificarlos antes a una cadena; `encoding` es la codificación de la respuesta (`res.encoding`)
+    o None para que el parser la detecte.
+    `cut_appendix` corta el documento en las referencias o el apéndice.
+    `footnotes` es 'anchor' para omitir los anclajes de notas al pie, 'parent' para omitir el elemento
+    que los contiene, o None para conservarlos.
+    '''
+    target = _ParagraphTarget(cut_appendix=cut_appendix, footnotes=footnotes)
+    parser = etree.HTMLParser(target=target, encoding=encoding)
+    view = memoryview(content)
+    for start in range(0, len(content), CHUNK_SIZE):
+        parser.feed(bytes(view[start:start + CHUNK_SIZE]))
+        if target.done:
+            break
+    return parser.close()
+
+def _legacy_extract_paragraphs(html, cut_appendix=True, footnotes='anchor'):
+    '''
+    Implementación original con reemplazos de cadenas y BeautifulSoup, solo para el benchmark y la
+    comprobación de paridad. Los argumentos reproducen cada `_add_article` original: sin `cut_appendix`
+    ni `footnotes` (comunicados) no se hacía ningún preprocesado
+    '''
+    from bs4 import BeautifulSoup
+    if cut_appendix or footnotes:
+        html = html.replace('<P', '<p').replace('</P>', '</p>')
+        html = html.replace('<p', '</p><p').replace('</p><p', '<p', 1)
+    if cut_appendix:
+        x = re.search(r'(<b>references|<b>appendix|<strong>references|<strong>appendix)', html.lower())
+        if x:
+            html = html[:x.start()]
+            html += '</body></html>'
+    article = BeautifulSoup(html, 'html.parser')
+    if footnotes:
+        for fn in article.find_all('a', {'name': re.compile(r'fn\d')}):
+            if footnotes == 'parent' and fn.parent:
+                fn.parent.decompose()
+            else:
+                fn.decompose()
+    paragraphs = article.findAll('p')
+    return [paragraph.get_text().strip() for paragraph in paragraphs]
+
+def _synthetic_minutes(paragraphs=400):
+    '''
+    Genera una página de minutas con el marcado de los años 90: <P> sin cerrar, notas al pie y apéndice
+    '''
+    sentence = 'The information reviewed at this meeting suggested that economic activity was expanding at a moderate pace. '
+    parts = ['<HTML><HEAD><TITLE>Minutes of the Federal Open Market Committee</TITLE></HEAD><BODY>']
+    for i in range(paragraphs):
+        parts.append('<P>' + sentence * 6)
+        if i % 50 == 0:
+            parts.append('<a name="fn{}">{}</a>'.format(i // 50 + 1, i // 50 + 1))
+    parts.append('<P><b>Appendix</b><P>' + sentence * 1000)
+    parts.append('</BODY></HTML>')
+    return ''.join(parts)
+
+# Argumentos de `extract_paragraphs` de cada tipo de contenido, según la URL del artículo
+_CONTENT_OPTIONS = [
+    (re.compile(r'^/newsevents/pressreleases/monetary\d{8}[ax].htm'), dict(cut_appendix=False, footnotes=None)),
+    (re.compile(r'^(/monetarypolicy/fomcminutes|/fomc/minutes|/fomc/MINUTES)'), dict(footnotes='anchor')),
+    (re.compile(r'^/?newsevents/speech/|^/boarddocs/speeches/'), dict(footnotes='parent')),
+    (re.compile(r'^/newsevents/testimony/|^/boarddocs/testimony/|^/boarddocs/hh/'), dict(footnotes='anchor')),
+]
+
+def parity_check(cache_dir='../data/FOMC/http_cache/', verbose=True):
+    '''
+    Compara `extract_paragraphs` con la implementación original sobre los artículos guardados en la caché
+    HTTP (FomcCache): comunicados, minutas, discursos y testimonios.
+    Retorna (nº de páginas comparadas, lista de URLs con diferencias).
+    '''
+    from urllib.parse import urlparse
+    index_dir = os.path.join(cache_dir, 'index')
+    n_pages = 0
+    mismatches = []
+    for filename in sorted(os.listdir(index_dir)):
+        with open(os.path.join(index_dir, filename), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        path = urlparse(meta['url']).path
+        options = next((options for regex, options in _CONTENT_OPTIONS if regex.match(path)), None)
+        if options is None or not path.lower().endswith('.htm'):
+            continue
+        digest = meta['sha256']
+        with open(os.path.join(cache_dir, 'blobs', digest[:2], digest), 'rb') as f:
+            content = f.read()
+        encoding = meta.get('encoding')
+        html = content.decode(encoding or 'utf-8', errors='replace')
+        n_pages += 1
+        if extract_paragraphs(content, encoding, **options) != _legacy_extract_paragraphs(html, **options):
+            mismatches.append(meta['url'])
+            if verbose: print("Diferencia en ", meta['url'])
+    return n_pages, mismatches
+
+if __name__ == '__main__':
+    # Bloques dentro de un párrafo sin cerrar: el texto posterior sigue perteneciendo al párrafo
+    assert extract_paragraphs(b'<p>x<table>t</table>y<p>z') == ['xty', 'z']
+    assert extract_paragraphs(b'<p>a<div>b</div>c</p>') == ['abc']
+    assert extract_paragraphs(b'<div><p>a</div>b<p>c') == ['a', 'c']
+
+    # Benchmark sobre una página de minutas sintética
+    html = _synthetic_minutes()
+    content = html.encode('utf-8')
+    assert extract_paragraphs(content, 'utf-8') == _legacy_extract_paragraphs(html)
+    legacy_time = min(timeit.repeat(lambda: _legacy_extract_paragraphs(html), number=1, repeat=5))
+    new_time = min(timeit.repeat(lambda: extract_paragraphs(content, 'utf-8'), number=1, repeat=5))
+    print("Página de minutas de {:.0f} KB".format(len(content) / 1e3))
+    print("BeautifulSoup:  {:.4f} s".format(legacy_time))
+    print("lxml:           {:.4f} s ({:.1f}x)".format(new_time, legacy_time / new_time))
+
+    # Paridad con la implementación original sobre páginas reales, si hay una caché HTTP descargada
+    cache_dir = sys.argv[1] if len(sys.argv) > 1 else '../data/FOMC/http_cache/'
+    if os.path.isdir(os.path.join(cache_dir, 'index')):
+        n_pages, mismatches = parity_check(cache_dir)
+        print("Paridad: {} páginas, {} con diferencias".format(n_pages, len(mismatches)))
+    else:
+        print("Sin caché HTTP en ", cache_dir, ", se omite la comprobación de paridad")
@@ -5,16 +5,9 @@ import os
 import pickle
 import re
 
-import requests
-from bs4 import BeautifulSoup
-
-import numpy as np
-import pandas as pd
-
-import textract
-
 # Importa la clase base
 from .FomcBase import FomcBase
+from .FomcPdfText import get_pdf_pool, pdf_to_sections
 
 class FomcMeetingScript(FomcBase):
     '''
@@ -25,8 +18,8 @@ class FomcMeetingScript(FomcBase):
         fomc = FomcMeetingScript()
         df = fomc.get_contents()
     '''
-    def __init__(self, verbose = True, max_threads = 10, base_dir = '../data/FOMC/'):
-        super().__init__('meeting_script', verbose, max_threads, base_dir)
+    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/', base_url='https://www.federalreserve.gov'):
+        super().__init__('meeting_script', verbose, max_threads, base_dir, base_url)
 
     def _get_links(self, from_year):
         '''
@@ -38,8 +31,7 @@ class FomcMeetingScript(FomcBase):
         self.speakers = []
         self.dates = []
 
-        r = requests.get(self.calendar_url)
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = self._get_soup(self.calendar_url)
         
         # Los guiones de las reuniones solo se pueden encontrar en el archivo, ya que se publican después de cinco años
         if from_year > 2014:
@@ -47,9 +39,8 @@ class FomcMeetingScript(FomcBase):
         if from_year <= 2014:
             for year in range(from_year, 2015):
                 yearly_contents = []
-                fomc_yearly_url = self.base_url + '/monetarypolicy/fomchistorical' + str(year) + '.htm'
-                r_year = requests.get(fomc_yearly_url)
-                soup_yearly = BeautifulSoup(r_year.text, 'html.parser')
+                fomc_yearly_url = self._historical_url(year)
+                soup_yearly = self._get_soup(fomc_yearly_url)
                 # Busca enlaces a archivos PDF de guiones de reuniones
                 meeting_scripts = soup_yearly.find_all('a', href=re.compile('^/monetarypolicy/files/FOMC\d{8}meeting.pdf'))
                 for meeting_script in meeting_scripts:
@@ -74,24 +65,11 @@ class FomcMeetingScript(FomcBase):
         pdf_filepath = self.base_dir + 'script_pdf/FOMC_MeetingScript_' + self._date_from_link(link) + '.pdf'
 
         # Los guiones solo se proporcionan en formato PDF. Guarda el PDF y pasa el contenido
-        res = requests.get(link_url)
+        res = self._get(link_url)
+        os.makedirs(os.path.dirname(pdf_filepath), exist_ok=True)
         with open(pdf_filepath, 'wb') as f:
             f.write(res.content)
 
-        # Extrae texto del PDF
-        pdf_file_parsed = textract.process(pdf_filepath).decode('utf-8')
-        paragraphs = re.sub('(\n)(\n)+', '\n', pdf_file_parsed.strip())
-        paragraphs = paragraphs.split('\n')
-
-        section = -1
-        paragraph_sections = []
-        for paragraph in paragraphs:
-            # Filtra los párrafos que no empiezan con fechas o palabras clave específicas
-            if not re.search('^(page|january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)', paragraph.lower()):
-                # Filtra los párrafos que no parecen ser encabezados de sección
-                if len(re.findall(r'[A-Z]', paragraph[:10])) > 5 and not re.search('(present|frb/us|abs cdo|libor|rp–ioer|lsaps|cusip|nairu|s cpi|clos, r)', paragraph[:10].lower()):
-                    section += 1
-                    paragraph_sections.append("")
-                if section >= 0:
-                    paragraph_sections[section] += paragraph
-        self.articles[index] = "\n\n[SECTION]\n\n".join([paragraph for paragraph in paragraph_sections])
+        # La extracción de texto se ejecuta en el pool de procesos; el hilo de descarga queda libre.
+        # El texto ya extraído de un PDF idéntico se lee de la caché en `script_text_cache/`
+        self.articles[index] = get_pdf_pool().submit(pdf_to_sections, pdf_filepath, self.base_dir + 'script_text_cache/')
@@ -5,14 +5,9 @@ import os
 import pickle
 import re
 
-import requests
-from bs4 import BeautifulSoup
-
-import numpy as np
-import pandas as pd
-
 # Importa la clase base
 from .FomcBase import FomcBase
+from .FomcHtmlParser import extract_paragraphs
 
 class FomcMinutes(FomcBase):
     '''
@@ -21,8 +16,8 @@ class FomcMinutes(FomcBase):
         fomc = FomcMinutes()
         df = fomc.get_contents()
     '''
-    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/'):
-        super().__init__('minutes', verbose, max_threads, base_dir)
+    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/', base_url='https://www.federalreserve.gov'):
+        super().__init__('minutes', verbose, max_threads, base_dir, base_url)
 
     def _get_links(self, from_year):
         '''
@@ -34,8 +29,7 @@ class FomcMinutes(FomcBase):
         self.speakers = []
         self.dates = []
 
-        r = requests.get(self.calendar_url)
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = self._get_soup(self.calendar_url)
 
         # Obtener enlaces de la página actual. Los guiones de las reuniones no están disponibles.
         if self.verbose: print("Obteniendo enlaces para las minutas...")
@@ -52,9 +46,8 @@ class FomcMinutes(FomcBase):
             print("Obteniendo enlaces de páginas de archivo...")
             for year in range(from_year, 2015):
                 yearly_contents = []
-                fomc_yearly_url = self.base_url + '/monetarypolicy/fomchistorical' + str(year) + '.htm'
-                r_year = requests.get(fomc_yearly_url)
-                soup_yearly = BeautifulSoup(r_year.text, 'html.parser')
+                fomc_yearly_url = self._historical_url(year)
+                soup_yearly = self._get_soup(fomc_yearly_url)
                 yearly_contents = soup_yearly.find_all('a', href=re.compile('(^/monetarypolicy/fomcminutes|^/fomc/minutes|^/fomc/MINUTES)'))
                 for yearly_content in yearly_contents:
                     self.links.append(yearly_content.attrs['href'])
@@ -92,27 +85,8 @@ class FomcMinutes(FomcBase):
             sys.stdout.write(".")
             sys.stdout.flush()
 
-        res = requests.get(self.base_url + link)
-        html = res.text
-
-        # La etiqueta <p> no está correctamente cerrada en muchos casos
-        html = html.replace('<P', '<p').replace('</P>', '</p>')
-        html = html.replace('<p', '</p><p').replace('</p><p', '<p', 1)
-
-        # Elimina todo después del apéndice o las referencias
-        x = re.search(r'(<b>references|<b>appendix|<strong>references|<strong>appendix)', html.lower())
-        if x:
-            html = html[:x.start()]
-            html += '</body></html>'
-        # Analiza el texto HTML con BeautifulSoup
-        article = BeautifulSoup(html, 'html.parser')
-
-        #if link == '/fomc/MINUTES/1994/19940517min.htm':
-        #    print(article)
-
-        # Elimina las notas al pie
-        for fn in article.find_all('a', {'name': re.compile('fn\d')}):
-            fn.decompose()
-        # Obtén todas las etiquetas <p>
-        paragraphs = article.findAll('p')
-        self.articles[index] = "\n\n[SECTION]\n\n".join([paragraph.get_text().strip() for paragraph in paragraphs])
+        res = self._get(self.base_url + link)
+        # Un solo recorrido con el parser de lxml: cierra los <p> sin cerrar, corta en el apéndice
+        # o las referencias y omite las notas al pie
+        paragraphs = extract_paragraphs(res.content, res.encoding, footnotes='anchor')
+        self.articles[index] = "\n\n[SECTION]\n\n".join(paragraphs)
@@ -0,0 +1,81 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+import hashlib
+import json
+import os
+
+from .FomcSegmenter import segment_transcript, SECTION_SEPARATOR
+
+# Versiones de cada etapa de la caché de texto extraído. Subir TEXT_VERSION invalida el texto
+# extraído por textract; subir SECTION_VERSION solo invalida la división en secciones.
+TEXT_VERSION = 1
+SECTION_VERSION = 1
+
+# Pool de procesos compartido por todas las clases que extraen texto de PDFs
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool():
+    '''
+    Devuelve el pool de procesos para la extracción de texto de PDFs, dimensionado al número de núcleos.
+    La extracción es intensiva en CPU, por lo que en threads quedaría serializada por el GIL.
+    '''
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # 'spawn' evita hacer fork de un proceso con threads de descarga activos
+            _pdf_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn'))
+    return _pdf_pool
+
+def _write_atomic(filepath, text):
+    '''
+    Escribe `text` en `filepath` mediante un archivo temporal y un rename atómico
+    '''
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_filepath = "{}.{}.tmp".format(filepath, os.getpid())
+    with open(tmp_filepath, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_filepath, filepath)
+
+def _extract_text(pdf_filepath):
+    '''
+    Extrae el texto plano de un PDF con textract (importado solo en los procesos que extraen)
+    '''
+    import textract
+    return textract.process(pdf_filepath).decode('utf-8')
+
+def pdf_to_sections(pdf_filepath, cache_dir=None):
+    '''
+    Extrae el texto de un guion en PDF y lo divide en secciones por orador.
+    Se ejecuta en un proceso del pool. textract solo acepta rutas de archivo, por lo que recibe
+    la ruta del PDF ya archivado en `script_pdf/` en lugar de sus bytes.
+    Con `cache_dir`, el texto extraído y las secciones se guardan por SHA-256 del PDF:
+        <cache_dir>/<sha256>.text-v<TEXT_VERSION>.txt
+        <cache_dir>/<sha256>.sections-v<SECTION_VERSION>-t<TEXT_VERSION>.json
+    de modo que una nueva ejecución no vuelve a procesar el PDF, y un cambio en la heurística
+    de secciones reutiliza el texto extraído.
+    '''
+    if cache_dir is None:
+        return SECTION_SEPARATOR.join(segment_transcript(_extract_text(pdf_filepath)))
+
+    with open(pdf_filepath, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    text_filepath = os.path.join(cache_dir, "{}.text-v{}.txt".format(digest, TEXT_VERSION))
+    sections_filepath = os.path.join(cache_dir, "{}.sections-v{}-t{}.json".format(digest, SECTION_VERSION, TEXT_VERSION))
+
+    if os.path.exists(sections_filepath):
+        with open(sections_filepath, 'r', encoding='utf-8') as f:
+            paragraph_sections = json.load(f)
+        return SECTION_SEPARATOR.join(paragraph_sections)
+
+    if os.path.exists(text_filepath):
+        with open(text_filepath, 'r', encoding='utf-8') as f:
+            pdf_file_parsed = f.read()
+    else:
+        pdf_file_parsed = _extract_text(pdf_filepath)
+        _write_atomic(text_filepath, pdf_file_parsed)
+
+    paragraph_sections = segment_transcript(pdf_file_parsed)
+    _write_atomic(sections_filepath, json.dumps(paragraph_sections))
+    return SECTION_SEPARATOR.join(paragraph_sections)
@@ -5,17 +5,9 @@ import os
 import pickle
 import re
 
-import requests
-from bs4 import BeautifulSoup
-
-import numpy as np
-import pandas as pd
-
-
-import textract
-
 # Importa la clase base
 from .FomcBase import FomcBase
+from .FomcPdfText import get_pdf_pool, pdf_to_sections
 
 class FomcPresConfScript(FomcBase):
     '''
@@ -25,8 +17,25 @@ class FomcPresConfScript(FomcBase):
         fomc = FomcPresConfScript()
         df = fomc.get_contents()
     '''
-    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/'):
-        super().__init__('presconf_script', verbose, max_threads, base_dir)
+    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/', base_url='https://www.federalreserve.gov'):
+        super().__init__('presconf_script', verbose, max_threads, base_dir, base_url)
+
+    def _presconf_urls(self, soup):
+        '''
+        Páginas de las conferencias de prensa enlazadas desde una página índice
+        '''
+        presconfs = soup.find_all('a', href=re.compile('^/monetarypolicy/fomcpresconf\d{8}.htm'))
+        return [self.base_url + presconf.attrs['href'] for presconf in presconfs]
+
+    def _detail_index_urls(self, from_year):
+        '''
+        Sobrescribe las páginas índice de segundo nivel: la página de cada conferencia de prensa, enlazada
+        desde el calendario y desde las páginas de archivo anteriores a 2015
+        '''
+        urls = self._presconf_urls(self._get_soup(self.calendar_url))
+        for year in range(from_year, 2015):
+            urls += self._presconf_urls(self._get_soup(self._historical_url(year)))
+        return urls
 
     def _get_links(self, from_year):
         '''
@@ -38,15 +47,12 @@ class FomcPresConfScript(FomcBase):
         self.speakers = []
         self.dates = []
 
-        r = requests.get(self.calendar_url)
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = self._get_soup(self.calendar_url)
         
         if self.verbose: print("Obteniendo enlaces para los guiones de conferencias de prensa...")
-        presconfs = soup.find_all('a', href=re.compile('^/monetarypolicy/fomcpresconf\d{8}.htm'))
-        presconf_urls = [self.base_url + presconf.attrs['href'] for presconf in presconfs]
+        presconf_urls = self._presconf_urls(soup)
         for presconf_url in presconf_urls:
-            r_presconf = requests.get(presconf_url)
-            soup_presconf = BeautifulSoup(r_presconf.text, 'html.parser')
+            soup_presconf = self._get_soup(presconf_url)
             contents = soup_presconf.find_all('a', href=re.compile('^/mediacenter/files/FOMCpresconf\d{8}.pdf'))
             for content in contents:
                 self.links.append(content.attrs['href'])
@@ -60,15 +66,12 @@ class FomcPresConfScript(FomcBase):
             print("Obteniendo enlaces de las páginas de archivo...")
             for year in range(from_year, 2015):
                 yearly_contents = []
-                fomc_yearly_url = self.base_url + '/monetarypolicy/fomchistorical' + str(year) + '.htm'
-                r_year = requests.get(fomc_yearly_url)
-                soup_yearly = BeautifulSoup(r_year.text, 'html.parser')
+                fomc_yearly_url = self._historical_url(year)
+                soup_yearly = self._get_soup(fomc_yearly_url)
 
-                presconf_hists = soup_yearly.find_all('a', href=re.compile('^/monetarypolicy/fomcpresconf\d{8}.htm'))
-                presconf_hist_urls = [self.base_url + presconf_hist.attrs['href'] for presconf_hist in presconf_hists]
+                presconf_hist_urls = self._presconf_urls(soup_yearly)
                 for presconf_hist_url in presconf_hist_urls:
-                    r_presconf_hist = requests.get(presconf_hist_url)
-                    soup_presconf_hist = BeautifulSoup(r_presconf_hist.text, 'html.parser')
+                    soup_presconf_hist = self._get_soup(presconf_hist_url)
                     yearly_contents = soup_presconf_hist.find_all('a', href=re.compile('^/mediacenter/files/FOMCpresconf\d{8}.pdf'))
                     for yearly_content in yearly_contents:
                         self.links.append(yearly_content.attrs['href'])
@@ -92,23 +95,11 @@ class FomcPresConfScript(FomcBase):
         pdf_filepath = self.base_dir + 'script_pdf/FOMC_PresConfScript_' + self._date_from_link(link) + '.pdf'
 
         # Los guiones se proporcionan solo en pdf. Guarda el pdf y pasa el contenido
-        res = requests.get(link_url)
-
+        res = self._get(link_url)
+        os.makedirs(os.path.dirname(pdf_filepath), exist_ok=True)
         with open(pdf_filepath, 'wb') as f:
             f.write(res.content)
 
-        # Extrae texto del pdf
-        pdf_file_parsed = textract.process(pdf_filepath).decode('utf-8')
-        paragraphs = re.sub('(\n)(\n)+', '\n', pdf_file_parsed.strip())
-        paragraphs = paragraphs.split('\n')
-
-        section = -1
-        paragraph_sections = []
-        for paragraph in paragraphs:
-            if not re.search('^(page|january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)', paragraph.lower()):
-                if len(re.findall(r'[A-Z]', paragraph[:10])) > 5 and not re.search('(present|frb/us|abs cdo|libor|rp–ioer|lsaps|cusip|nairu|s cpi|clos, r)', paragraph[:10].lower()):
-                    section += 1
-                    paragraph_sections.append("")
-                if section >= 0:
-                    paragraph_sections[section] += paragraph
-        self.articles[index] = "\n\n[SECTION]\n\n".join([paragraph for paragraph in paragraph_sections])
+        # La extracción de texto se ejecuta en el pool de procesos; el hilo de descarga queda libre.
+        # El texto ya extraído de un PDF idéntico se lee de la caché en `script_text_cache/`
+        self.articles[index] = get_pdf_pool().submit(pdf_to_sections, pdf_filepath, self.base_dir + 'script_text_cache/')
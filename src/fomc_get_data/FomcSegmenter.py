@@ -0,0 +1,117 @@
+from collections import namedtuple
+import timeit
+import re
+
+# Separador entre secciones en la columna `contents` de los guiones
+SECTION_SEPARATOR = "\n\n[SECTION]\n\n"
+
+# Una intervención de un orador en un guion: el orador (o None si no se reconoce) y su texto
+SpeakerTurn = namedtuple('SpeakerTurn', ['speaker', 'text'])
+
+# Patrones precompilados. Las líneas a omitir solo pueden empezar por estas letras, lo que evita
+# evaluar la alternancia en la mayoría de las líneas; el resto se evalúa sobre los 9 primeros caracteres
+_BLANK_LINES = re.compile('\n\n+')
+_SKIP_FIRST = frozenset('pjfmasondPJFMASOND')
+_SKIP_LINE = re.compile('(page|january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)')
+_UPPER = re.compile('[A-Z]')
+_NOT_HEADER = re.compile('(present|frb/us|abs cdo|libor|rp–ioer|lsaps|cusip|nairu|s cpi|clos, r)')
+_SPEAKER = re.compile(r"((?:[A-Z][A-Z'\-]*\.? )*[A-Z][A-Z'\-]+)\.")
+
+def _is_header(line):
+    '''
+    Una línea abre una nueva sección si tiene más de 5 mayúsculas en sus 10 primeros caracteres
+    (p. ej. "CHAIRMAN GREENSPAN.") y no es una de las siglas conocidas
+    '''
+    # Con 6 mayúsculas en 10 caracteres al menos una cae en las posiciones 5-9: si ese tramo está
+    # en minúsculas (el caso de casi todas las líneas de texto) se descarta sin evaluar regex
+    if line[5:10].islower():
+        return False
+    return len(_UPPER.findall(line, 0, 10)) > 5 and not _NOT_HEADER.search(line[:10].lower())
+
+def _iter_sections(text):
+    '''
+    Recorre el texto una sola vez y devuelve las secciones como listas de líneas
+    '''
+    buffer = None
+    for line in _BLANK_LINES.sub('\n', text.strip()).split('\n'):
+        # Se omiten los encabezados de página y las fechas
+        if line[:1] in _SKIP_FIRST and _SKIP_LINE.match(line[:9].lower()):
+            continue
+        if _is_header(line):
+            if buffer is not None:
+                yield buffer
+            buffer = [line]
+        elif buffer is not None:
+            buffer.append(line)
+    if buffer is not None:
+        yield buffer
+
+def segment_transcript(text):
+    '''
+    Divide el texto de un guion en secciones, una por intervención.
+    Devuelve una lista de cadenas; `SECTION_SEPARATOR.join(...)` reproduce la columna `contents`.
+    '''
+    return [''.join(lines) for lines in _iter_sections(text)]
+
+def speaker_turns(text):
+    '''
+    Divide el texto de un guion en intervenciones estructuradas (`SpeakerTurn`)
+    '''
+    turns = []
+    for section in segment_transcript(text):
+        m = _SPEAKER.match(section)
+        if m:
+            turns.append(SpeakerTurn(m.group(1), section[m.end():].strip()))
+        else:
+            turns.append(SpeakerTurn(None, section))
+    return turns
+
+def _legacy_segment_transcript(pdf_file_parsed):
+    '''
+    Implementación original (re.search sin compilar y concatenación de cadenas), solo para el benchmark
+    '''
+    paragraphs = re.sub('(\n)(\n)+', '\n', pdf_file_parsed.strip())
+    paragraphs = paragraphs.split('\n')
+
+    section = -1
+    paragraph_sections = []
+    for paragraph in paragraphs:
+        if not re.search('^(page|january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)', paragraph.lower()):
+            if len(re.findall(r'[A-Z]', paragraph[:10])) > 5 and not re.search('(present|frb/us|abs cdo|libor|rp–ioer|lsaps|cusip|nairu|s cpi|clos, r)', paragraph[:10].lower()):
+                section += 1
+                paragraph_sections.append("")
+            if section >= 0:
+                paragraph_sections[section] += paragraph
+    return paragraph_sections
+
+def _synthetic_transcript(pages=300, lines_per_page=60):
+    '''
+    Genera un guion sintético con la estructura de los PDFs del FOMC
+    '''
+    speakers = ['CHAIRMAN GREENSPAN.', 'MR. KOHN.', 'VICE CHAIRMAN MCDONOUGH.', 'MS. MINEHAN.', 'MR. PARRY.']
+    sentence = 'We expect growth to moderate as the effects of earlier policy actions work through the economy.'
+    lines = []
+    for page in range(pages):
+        lines.append('Page {} of {}'.format(page + 1, pages))
+        lines.append('June 30-July 1, 1998')
+        # Cada 50 páginas hay una presentación del staff de 5 páginas sin cambio de orador
+        in_briefing = page % 50 < 5
+        for i in range(lines_per_page):
+            if i % 40 == 0 and (not in_briefing or (page % 50 == 0 and i == 0)):
+                lines.append(speakers[(page + i) % len(speakers)] + ' ' + sentence)
+            else:
+                lines.append(sentence)
+        lines.append('')
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    # Benchmark sobre un guion sintético de 300 páginas
+    text = _synthetic_transcript()
+    legacy = _legacy_segment_transcript(text)
+    sections = segment_transcript(text)
+    assert sections == legacy
+    legacy_time = min(timeit.repeat(lambda: _legacy_segment_transcript(text), number=1, repeat=5))
+    new_time = min(timeit.repeat(lambda: segment_transcript(text), number=1, repeat=5))
+    print("Guion de 300 páginas, {} secciones".format(len(sections)))
+    print("Original:     {:.3f} s".format(legacy_time))
+    print("Segmentador:  {:.3f} s ({:.1f}x)".format(new_time, legacy_time / new_time))
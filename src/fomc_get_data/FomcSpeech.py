@@ -5,14 +5,9 @@ import os
 import pickle
 import re
 
-import requests
-from bs4 import BeautifulSoup
-
-import numpy as np
-import pandas as pd
-
 # Importa la clase base
 from .FomcBase import FomcBase
+from .FomcHtmlParser import extract_paragraphs
 
 class FomcSpeech(FomcBase):
     '''
@@ -21,10 +16,27 @@ class FomcSpeech(FomcBase):
         fomc = FomcSpeech()
         df = fomc.get_contents()
     '''
-    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/'):
-        super().__init__('speech', verbose, max_threads, base_dir)
+    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/', base_url='https://www.federalreserve.gov'):
+        super().__init__('speech', verbose, max_threads, base_dir, base_url)
         self.speech_base_url = self.base_url + '/newsevents/speech'
 
+    def _speech_index_url(self, year):
+        '''
+        URL de la página índice de discursos de un año
+        '''
+        # Archivos entre 1996 y 2005, la URL cambió desde 2011
+        if year < 2011:
+            return self.speech_base_url + '/' + str(year) + 'speech.htm'
+        else:
+            return self.speech_base_url + '/' + str(year) + '-speeches.htm'
+
+    def _index_urls(self, from_year):
+        '''
+        Sobrescribe las páginas índice: el calendario y una página de discursos por año desde 1996
+        '''
+        to_year = int(datetime.today().strftime("%Y"))
+        return [self.calendar_url] + [self._speech_index_url(year) for year in range(max(from_year, 1996), to_year + 1)]
+
     def _get_links(self, from_year):
         '''
         Sobrescribe la función privada que establece todos los enlaces para los contenidos a descargar en el sitio web del FOMC
@@ -35,8 +47,7 @@ class FomcSpeech(FomcBase):
         self.speakers = []
         self.dates = []
 
-        res = requests.get(self.calendar_url)
-        soup = BeautifulSoup(res.text, 'html.parser')
+        soup = self._get_soup(self.calendar_url)
 
         if self.verbose: print("Obteniendo enlaces para discursos...")
         to_year = datetime.today().strftime("%Y")
@@ -45,14 +56,8 @@ class FomcSpeech(FomcBase):
             print("Archivo solo desde 1996, estableciendo from_year como 1996...")
             from_year = 1996
         for year in range(from_year, int(to_year)+1):
-            # Archivos entre 1996 y 2005, la URL cambió desde 2011
-            if year < 2011:
-                speech_url = self.speech_base_url + '/' + str(year) + 'speech.htm'
-            else:
-                speech_url = self.speech_base_url + '/' + str(year) + '-speeches.htm'
-
-            res = requests.get(speech_url)
-            soup = BeautifulSoup(res.text, 'html.parser')
+            speech_url = self._speech_index_url(year)
+            soup = self._get_soup(speech_url)
             speech_links = soup.findAll('a', href=re.compile('^/?newsevents/speech/.*{}\d\d\d\d.*.htm|^/boarddocs/speeches/{}/|^{}\d\d\d\d.*.htm'.format(str(year), str(year), str(year))))
             for speech_link in speech_links:
                 # A veces se pone el mismo enlace para ver el video en vivo. Omitir esos.
@@ -93,24 +98,8 @@ class FomcSpeech(FomcBase):
             sys.stdout.write(".")
             sys.stdout.flush()
 
-        res = requests.get(self.base_url + link)
-        html = res.text
-        # La etiqueta p no está correctamente cerrada en muchos casos
-        html = html.replace('<P', '<p').replace('</P>', '</p>')
-        html = html.replace('<p', '</p><p').replace('</p><p', '<p', 1)
-        # eliminar todo después del apéndice o referencias
-        x = re.search(r'(<b>references|<b>appendix|<strong>references|<strong>appendix)', html.lower())
-        if x:
-            html = html[:x.start()]
-            html += '</body></html>'
-        # Analizar el texto HTML con BeautifulSoup
-        article = BeautifulSoup(html, 'html.parser')
-        # Eliminar nota al pie
-        for fn in article.find_all('a', {'name': re.compile('fn\d')}):
-            if fn.parent:
-                fn.parent.decompose()
-            else:
-                fn.decompose()
-        # Obtener todas las etiquetas p
-        paragraphs = article.findAll('p')
-        self.articles[index] = "\n\n[SECTION]\n\n".join([paragraph.get_text().strip() for paragraph in paragraphs])
+        res = self._get(self.base_url + link)
+        # Un solo recorrido con el parser de lxml: cierra los <p> sin cerrar, corta en el apéndice
+        # o las referencias y omite las notas al pie
+        paragraphs = extract_paragraphs(res.content, res.encoding, footnotes='parent')
+        self.articles[index] = "\n\n[SECTION]\n\n".join(paragraphs)
@@ -5,14 +5,9 @@ import os
 import pickle
 import re
 
-import requests
-from bs4 import BeautifulSoup
-
-import numpy as np
-import pandas as pd
-
 # Importa la clase base
 from .FomcBase import FomcBase
+from .FomcHtmlParser import extract_paragraphs
 
 class FomcStatement(FomcBase):
     '''
@@ -21,8 +16,8 @@ class FomcStatement(FomcBase):
         fomc = FomcStatement()
         df = fomc.get_contents()
     '''
-    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/'):
-        super().__init__('statement', verbose, max_threads, base_dir)
+    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/', base_url='https://www.federalreserve.gov'):
+        super().__init__('statement', verbose, max_threads, base_dir, base_url)
 
     def _get_links(self, from_year):
         '''
@@ -34,8 +29,7 @@ class FomcStatement(FomcBase):
         self.speakers = []
         self.dates = []
 
-        r = requests.get(self.calendar_url)
-        soup = BeautifulSoup(r.text, 'html.parser')
+        soup = self._get_soup(self.calendar_url)
         
         # Obtener enlaces de la página actual. Los guiones de la reunión no están disponibles.
         if self.verbose: print("Obteniendo enlaces para comunicados...")
@@ -56,9 +50,8 @@ class FomcStatement(FomcBase):
             print("Obteniendo enlaces de páginas de archivo...")
             for year in range(from_year, 2015):
                 yearly_contents = []
-                fomc_yearly_url = self.base_url + '/monetarypolicy/fomchistorical' + str(year) + '.htm'
-                r_year = requests.get(fomc_yearly_url)
-                soup_yearly = BeautifulSoup(r_year.text, 'html.parser')
+                fomc_yearly_url = self._historical_url(year)
+                soup_yearly = self._get_soup(fomc_yearly_url)
                 yearly_contents = soup_yearly.findAll('a', text='Statement')
                 for yearly_content in yearly_contents:
                     self.links.append(yearly_content.attrs['href'])
@@ -91,8 +84,6 @@ class FomcStatement(FomcBase):
             sys.stdout.write(".")
             sys.stdout.flush()
 
-        res = requests.get(self.base_url + link)
-        html = res.text
-        article = BeautifulSoup(html, 'html.parser')
-        paragraphs = article.findAll('p')
-        self.articles[index] = "\n\n[SECTION]\n\n".join([paragraph.get_text().strip() for paragraph in paragraphs])
+        res = self._get(self.base_url + link)
+        paragraphs = extract_paragraphs(res.content, res.encoding, cut_appendix=False, footnotes=None)
+        self.articles[index] = "\n\n[SECTION]\n\n".join(paragraphs)
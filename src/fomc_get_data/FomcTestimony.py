@@ -5,15 +5,11 @@ import os
 import pickle
 import re
 
-import requests
-from bs4 import BeautifulSoup
 import json
 
-import numpy as np
-import pandas as pd
-
 # Importa la clase base
 from .FomcBase import FomcBase
+from .FomcHtmlParser import extract_paragraphs
 
 class FomcTestimony(FomcBase):
     '''
@@ -23,8 +19,21 @@ class FomcTestimony(FomcBase):
         fomc = FomcTestimony()
         df = fomc.get_contents()
     '''
-    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/'):
-        super().__init__('testimony', verbose, max_threads, base_dir)
+    def __init__(self, verbose=True, max_threads=10, base_dir='../data/FOMC/', base_url='https://www.federalreserve.gov'):
+        super().__init__('testimony', verbose, max_threads, base_dir, base_url)
+        self.testimony_json_url = self.base_url + '/json/ne-testimony.json'
+
+    def _testimony_index_url(self, year):
+        '''
+        URL de la página índice de testimonios de un año (archivo anterior a 2006)
+        '''
+        return self.base_url + '/newsevents/testimony/' + str(year) + 'testimony.htm'
+
+    def _index_urls(self, from_year):
+        '''
+        Sobrescribe las páginas índice: el json de testimonios y las páginas anuales entre 1996 y 2005
+        '''
+        return [self.testimony_json_url] + [self._testimony_index_url(year) for year in range(max(from_year, 1996), 2006)]
 
     def _get_links(self, from_year):
         '''
@@ -45,8 +54,8 @@ class FomcTestimony(FomcBase):
         elif from_year > 2006:
             print("Todos los datos desde 2006 están en un solo json, así que se devuelven todos desde 2006 aunque se especifique el año ", from_year)
 
-        url = self.base_url + '/json/ne-testimony.json'
-        res = requests.get(url)
+        url = self.testimony_json_url
+        res = self._get(url)
         res.encoding = 'utf-8-sig'  # Establecer la codificación para manejar BOM
         res_list = json.loads(res.text)
         for record in res_list:
@@ -60,10 +69,9 @@ class FomcTestimony(FomcBase):
 
         if from_year < 2006:
             for year in range(from_year, 2006):
-                url = self.base_url + '/newsevents/testimony/' + str(year) + 'testimony.htm'
+                url = self._testimony_index_url(year)
 
-                res = requests.get(url)
-                soup = BeautifulSoup(res.text, 'html.parser')
+                soup = self._get_soup(url)
 
                 doc_links = soup.findAll('a', href=re.compile('^/boarddocs/testimony/{}/|^/boarddocs/hh/{}/'.format(str(year), str(year))))
                 for doc_link in doc_links:
@@ -108,21 +116,8 @@ class FomcTestimony(FomcBase):
 
         link_url = self.base_url + link
 
-        res = requests.get(self.base_url + link)
-        html = res.text
-        # La etiqueta p no está cerrada correctamente en muchos casos
-        html = html.replace('<P', '<p').replace('</P>', '</p>')
-        html = html.replace('<p', '</p><p').replace('</p><p', '<p', 1)
-        # Eliminar todo después de apéndice o referencias
-        x = re.search(r'(<b>references|<b>appendix|<strong>references|<strong>appendix)', html.lower())
-        if x:
-            html = html[:x.start()]
-            html += '</body></html>'
-        # Analizar el texto HTML con BeautifulSoup
-        article = BeautifulSoup(html, 'html.parser')
-        # Eliminar nota al pie
-        for fn in article.find_all('a', {'name': re.compile('fn\d')}):
-            fn.decompose()
-        # Obtener todas las etiquetas p
-        paragraphs = article.findAll('p')
-        self.articles[index] = "\n\n[SECTION]\n\n".join([paragraph.get_text().strip() for paragraph in paragraphs])
+        res = self._get(self.base_url + link)
+        # Un solo recorrido con el parser de lxml: cierra los <p> sin cerrar, corta en el apéndice
+        # o las referencias y omite las notas al pie
+        paragraphs = extract_paragraphs(res.content, res.encoding, footnotes='anchor')
+        self.articles[index] = "\n\n[SECTION]\n\n".join(paragraphs)
@@ -1,6 +1,41 @@
-from .FomcStatement import FomcStatement
-from .FomcMinutes import FomcMinutes
-from .FomcMeetingScript import FomcMeetingScript
-from .FomcPresConfScript import FomcPresConfScript
-from .FomcSpeech import FomcSpeech
-from .FomcTestimony import FomcTestimony
\ No newline at end of file
+import importlib
+
+# Clases del paquete y su módulo. Se importan la primera vez que se piden (PEP 562), de modo que
+# `from fomc_get_data import FomcStatement` no carga los demás extractores ni sus dependencias (textract, pyarrow...)
+_CLASSES = {
+    'FomcStatement': '.FomcStatement',
+    'FomcMinutes': '.FomcMinutes',
+    'FomcMeetingScript': '.FomcMeetingScript',
+    'FomcPresConfScript': '.FomcPresConfScript',
+    'FomcSpeech': '.FomcSpeech',
+    'FomcTestimony': '.FomcTestimony',
+    'FomcCalendar': '.FomcCalendar',
+}
+
+# Tipo de contenido de la línea de comandos -> clase que lo descarga
+SCRAPERS = {
+    'statement': 'FomcStatement',
+    'minutes': 'FomcMinutes',
+    'meeting_script': 'FomcMeetingScript',
+    'presconf_script': 'FomcPresConfScript',
+    'speech': 'FomcSpeech',
+    'testimony': 'FomcTestimony',
+}
+
+__all__ = list(_CLASSES) + ['SCRAPERS', 'get_scraper']
+
+def __getattr__(name):
+    if name in _CLASSES:
+        cls = getattr(importlib.import_module(_CLASSES[name], __name__), name)
+        globals()[name] = cls
+        return cls
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(_CLASSES))
+
+def get_scraper(content_type):
+    '''
+    Clase que descarga `content_type` ('statement', 'minutes', ...), importando solo su módulo
+    '''
+    return __getattr__(SCRAPERS[content_type])
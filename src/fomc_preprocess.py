@@ -0,0 +1,385 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import timeit
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Palabras, incluidas las contracciones, como en 3_preprocesar_textos.ipynb; se compila una sola vez
+_WORD = re.compile(r"\b([a-zA-Z]+n't|[a-zA-Z]+'s|[a-zA-Z]+)\b")
+
+# Marca de separación de secciones en la columna `contents`
+SECTION_TAG = "[SECTION]"
+
+MEETING_DOC_TYPES = ('statement', 'minutes', 'presconf_script', 'meeting_script')
+OTHER_DOC_TYPES = ('speech', 'testimony')
+
+def tokenize(text):
+    '''
+    Devuelve la lista de palabras del texto
+    '''
+    return _WORD.findall(text)
+
+def get_word_count(x):
+    '''
+    Devuelve el número de palabras para el texto dado x, sin contar la etiqueta "[SECTION]"
+    '''
+    return len(_WORD.findall(x.replace(SECTION_TAG, "")))
+
+def clean_text(contents):
+    '''
+    Elimina los saltos de línea del contenido, como la columna `text` de reorganize_df
+    '''
+    return contents.replace('\n', '').replace('\r', '').strip()
+
+def section_word_counts(text_sections):
+    '''
+    Número de palabras de cada sección
+    '''
+    return [len(_WORD.findall(section)) for section in text_sections]
+
+def select_sections(text_sections, counts, min_words=50, backup_words=20):
+    '''
+    Índices de las secciones con más de `min_words` palabras o, si no hay ninguna, de las que tienen
+    más de `backup_words` como respaldo. Lista vacía si tampoco hay de estas.
+    '''
+    selected = [i for i, count in enumerate(counts) if count > min_words]
+    if not selected:
+        selected = [i for i, count in enumerate(counts) if count > backup_words]
+    return selected
+
+def split_words(words, split_len=200, overlap=50):
+    '''
+    Divide una lista de palabras en ventanas de `split_len` palabras con superposición de `overlap`
+    '''
+    if len(words) < split_len:
+        n = 1
+    else:
+        n = (len(words) - overlap) // (split_len - overlap) + 1
+    step = split_len - overlap
+    return [words[step * i: step * i + split_len] for i in range(n)]
+
+def get_split(text, split_len=200, overlap=50):
+    '''
+    Devuelve una lista de textos divididos de longitud $split_len con superposición de $overlap.
+    Cada elemento de la lista tendrá aproximadamente split_len palabras de texto.
+    '''
+    return [" ".join(window) for window in split_words(_WORD.findall(text), split_len, overlap)]
+
+def preprocess_document(contents, min_words=50, split_len=200, overlap=50):
+    '''
+    Tokeniza una sola vez cada sección de un documento (`contents` de FomcGetData) y obtiene de las mismas
+    listas de palabras el conteo por sección, el texto filtrado de remove_short_section y las divisiones
+    de get_split_df. Con `split_len=None` no se divide.
+    '''
+    text = clean_text(contents)
+    text_sections = text.split(SECTION_TAG)
+    section_words = [_WORD.findall(section) for section in text_sections]
+    counts = [len(words) for words in section_words]
+    selected = select_sections(text_sections, counts, min_words)
+    # Las secciones se unen con un espacio, así que las palabras del texto son las de las secciones
+    words = [word for i in selected for word in section_words[i]]
+    windows = split_words(words, split_len, overlap) if split_len and words else []
+    return {
+        'word_count': get_word_count(contents),
+        'section_word_count': counts,
+        'filtered_text': " ".join(text_sections[i] for i in selected).strip(),
+        'filtered_word_count': len(words),
+        'splits': [" ".join(window) for window in windows],
+        'split_word_count': [len(window) for window in windows]
+    }
+
+def _count_batch(contents_list):
+    '''
+    Trabajo de un proceso: número de palabras de cada documento y de cada una de sus secciones
+    '''
+    return [(get_word_count(contents), section_word_counts(clean_text(contents).split(SECTION_TAG)))
+            for contents in contents_list]
+
+def _split_batch(args):
+    '''
+    Trabajo de un proceso: divisiones de cada texto y su número de palabras
+    '''
+    texts, split_len, overlap = args
+    results = []
+    for text in texts:
+        windows = split_words(_WORD.findall(text), split_len, overlap)
+        results.append(([" ".join(window) for window in windows], [len(window) for window in windows]))
+    return results
+
+def _preprocess_batch(args):
+    '''
+    Trabajo de un proceso: preprocess_document sobre un lote de documentos
+    '''
+    contents_list, min_words, split_len, overlap = args
+    return [preprocess_document(contents, min_words, split_len, overlap) for contents in contents_list]
+
+def batch_map(func, items, processes=None, batch_size=64, args=()):
+    '''
+    Aplica `func` por lotes de `batch_size` elementos en un pool de `processes` procesos y devuelve los
+    resultados concatenados en orden. `func` recibe la lista del lote o, si se dan `args`, la tupla
+    (lote, *args), y devuelve una lista. Con `processes=1` o un solo lote, se ejecuta en el proceso actual.
+    '''
+    items = list(items)
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    if args:
+        batches = [(batch,) + tuple(args) for batch in batches]
+    if processes == 1 or len(batches) <= 1:
+        return [result for batch in batches for result in func(batch)]
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return [result for batch in executor.map(func, batches) for result in batch]
+
+def _repeat_rows(df, repeats):
+    '''
+    Repite cada fila de `df` el número de veces indicado. Las columnas de texto se repiten como referencias
+    a las mismas cadenas (dtype object), sin copiar su contenido.
+    '''
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        columns[column] = pd.Series(np.repeat(values, repeats), dtype=object if values.dtype == object else values.dtype)
+    return pd.DataFrame(columns, columns=df.columns)
+
+def _calendar_lookup(calendar, dates, column):
+    '''
+    Valor de `column` en el calendario para cada fecha, o None si la fecha no es de reunión
+    '''
+    calendar = calendar[~calendar.index.duplicated(keep='first')]
+    values = calendar[column].reindex(pd.DatetimeIndex(dates))
+    return values.astype(object).where(values.notnull(), None).values
+
+def get_next_meeting_dates(calendar, dates):
+    '''
+    Fecha de la siguiente reunión del FOMC posterior a x + 2 días (las reuniones suelen durar dos días)
+    para cada fecha x, o NaT si no la hay o si x + 2 días es anterior a la primera reunión del calendario
+    '''
+    meetings = np.sort(pd.DatetimeIndex(calendar.index).values)
+    shifted = (pd.DatetimeIndex(dates) + pd.Timedelta(days=2)).values
+    positions = np.searchsorted(meetings, shifted, side='right')
+    valid = (positions < len(meetings)) & (shifted >= meetings[0])
+    result = np.full(len(shifted), np.datetime64('NaT'), dtype='datetime64[ns]')
+    result[valid] = meetings[positions[valid]]
+    return pd.DatetimeIndex(result)
+
+def _build_reorganized(df, doc_type, calendar, word_counts, counts):
+    '''
+    Construye el DataFrame de reorganize_df a partir de los conteos de palabras de cada documento y por sección
+    '''
+    if doc_type in MEETING_DOC_TYPES:
+        is_meeting_doc = True
+    elif doc_type in OTHER_DOC_TYPES:
+        is_meeting_doc = False
+    else:
+        print("¡Se ha proporcionado un doc_type [{}] inválido!".format(doc_type))
+        return None
+
+    text = df['contents'].map(clean_text)
+    dates = pd.to_datetime(df['date'])
+    next_meeting = get_next_meeting_dates(calendar, dates)
+    no_value = np.full(len(df), None, dtype=object)
+
+    new_df = pd.DataFrame({
+        'type': doc_type,
+        'date': df['date'],
+        'title': df['title'],
+        'speaker': df['speaker'],
+        'word_count': word_counts,
+        'decision': _calendar_lookup(calendar, dates, 'RateDecision') if is_meeting_doc else no_value,
+        'rate': _calendar_lookup(calendar, dates, 'Rate') if is_meeting_doc else no_value,
+        'next_meeting': next_meeting,
+        'next_decision': _calendar_lookup(calendar, next_meeting, 'RateDecision'),
+        'next_rate': _calendar_lookup(calendar, next_meeting, 'Rate'),
+        'text': text,
+        'text_sections': text.map(lambda x: x.split(SECTION_TAG)),
+        'section_word_count': pd.Series(counts, index=df.index, dtype=object),
+        'org_text': df['contents']
+    }, index=df.index)
+
+    new_df['decision'] = new_df['decision'].astype('Int8')
+    new_df['next_decision'] = new_df['next_decision'].astype('Int8')
+
+    print("No se encontró decisión de tasa para: ", new_df['decision'].isnull().sum())
+    print("Forma del dataframe: ", new_df.shape)
+    return new_df
+
+def reorganize_df(df, doc_type, calendar, processes=None):
+    '''
+    Reorganiza el dataframe cargado, que se ha obtenido mediante FomcGetData para un procesamiento adicional
+        - Añade tipo
+        - Añade conteo de palabras por sección (section_word_count) y total (word_count)
+        - Añade tasa, decisión (para documentos de reuniones, None para los demás)
+        - Añade fecha de la próxima reunión, tasa y decisión
+        - Copia el contenido a org_text
+        - Elimina saltos de línea del contenido en text
+        - Divide el contenido por "[SECTION]" en una lista en text_sections
+    `calendar` es el calendario preprocesado (indexado por fecha, con las columnas Rate y RateDecision).
+    Los documentos se tokenizan en un pool de `processes` procesos. word_count se cuenta sobre el contenido
+    original, como get_word_count en el cuaderno: en `text` se han eliminado los saltos de línea y las palabras
+    a ambos lados quedan unidas, así que no es la suma de section_word_count.
+    '''
+    results = batch_map(_count_batch, df['contents'], processes)
+    return _build_reorganized(df, doc_type, calendar, [word_count for word_count, _ in results],
+                              [counts for _, counts in results])
+
+def _filter_rows(df, texts, word_counts):
+    new_df = df.copy()
+    new_df['text'] = texts
+    new_df['word_count'] = word_counts
+    return new_df.loc[new_df['word_count'] > 0]
+
+def remove_short_section(df, min_words=50, processes=None):
+    '''
+    Utiliza 'text_sections' del DataFrame dado para eliminar secciones con menos de min_words.
+    Concatena las secciones que exceden min_words con un espacio y actualiza 'text'.
+    Como respaldo, mantiene un texto que concatena secciones con más de 20 palabras y lo usa
+     si no hay secciones con más de min_words.
+    Si no hay secciones con más de 20 palabras, elimina la fila.
+    Usa los conteos de 'section_word_count' si existen, sin volver a tokenizar.
+    '''
+    if 'section_word_count' in df.columns:
+        counts = list(df['section_word_count'])
+    else:
+        counts = [counts for _, counts in batch_map(_count_batch, [SECTION_TAG.join(sections) for sections in df['text_sections']], processes)]
+
+    new_text_list = []
+    new_wc_list = []
+    for sections, section_counts in zip(df['text_sections'], counts):
+        selected = select_sections(sections, section_counts, min_words)
+        new_text_list.append(" ".join(sections[i] for i in selected).strip())
+        # Las secciones se unen con un espacio, así que las palabras del texto son las de las secciones
+        new_wc_list.append(sum(section_counts[i] for i in selected))
+    return _filter_rows(df, new_text_list, new_wc_list)
+
+def _build_split(df, splits, split_word_counts):
+    split_df = _repeat_rows(df, [len(texts) for texts in splits])
+    split_df['text'] = [text for texts in splits for text in texts]
+    split_df['word_count'] = [count for counts in split_word_counts for count in counts]
+    if 'decision' in split_df.columns:
+        split_df['decision'] = split_df['decision'].astype('Int8')
+    if 'next_decision' in split_df.columns:
+        split_df['next_decision'] = split_df['next_decision'].astype('Int8')
+    return split_df
+
+def get_split_df(df, split_len=200, overlap=50, processes=None):
+    '''
+    Devuelve un DataFrame que es una extensión del DataFrame de entrada.
+    Cada fila en el nuevo DataFrame tiene menos de $split_len palabras en 'text'.
+    '''
+    results = batch_map(_split_batch, df['text'], processes, args=(split_len, overlap))
+    return _build_split(df, [splits for splits, _ in results], [counts for _, counts in results])
+
+def preprocess_df(df, doc_type, calendar, min_words=50, split_len=200, overlap=50, processes=None):
+    '''
+    Equivale a reorganize_df, remove_short_section y get_split_df encadenados, pero tokenizando cada documento
+    una sola vez con preprocess_document, por lotes en un pool de `processes` procesos.
+    Retorna los tres DataFrames: (reorganizado, filtrado, dividido).
+    '''
+    results = batch_map(_preprocess_batch, df['contents'], processes, args=(min_words, split_len, overlap))
+    reorganized = _build_reorganized(df, doc_type, calendar, [result['word_count'] for result in results],
+                                     [result['section_word_count'] for result in results])
+    if reorganized is None:
+        return None
+    filtered = _filter_rows(reorganized, [result['filtered_text'] for result in results],
+                            [result['filtered_word_count'] for result in results])
+    kept = [result for result in results if result['filtered_word_count'] > 0]
+    split = _build_split(filtered, [result['splits'] for result in kept], [result['split_word_count'] for result in kept])
+    return reorganized, filtered, split
+
+def _legacy_remove_short_section(df, min_words=50):
+    '''
+    Implementación original del cuaderno (iterrows y re.findall sin compilar), solo para el benchmark
+    '''
+    new_df = df.copy()
+    new_text_list = []
+    new_wc_list = []
+    for i, row in new_df.iterrows():
+        new_text = ""
+        bk_text = ""
+        for section in row['text_sections']:
+            num_words = len(re.findall(r'\b([a-zA-Z]+n\'t|[a-zA-Z]+\'s|[a-zA-Z]+)\b', section))
+            if num_words > min_words:
+                new_text += " " + section
+            elif num_words > 20:
+                bk_text += " " + section
+        new_text = new_text.strip()
+        bk_text = bk_text.strip()
+        if len(new_text) > 0:
+            new_text_list.append(new_text)
+        elif len(bk_text) > 0:
+            new_text_list.append(bk_text)
+        else:
+            new_text_list.append("")
+        new_wc_list.append(len(re.findall(r'\b([a-zA-Z]+n\'t|[a-zA-Z]+\'s|[a-zA-Z]+)\b', new_text_list[-1])))
+    new_df['text'] = new_text_list
+    new_df['word_count'] = new_wc_list
+    return new_df.loc[new_df['word_count'] > 0]
+
+def _legacy_get_split_df(df, split_len=200, overlap=50):
+    '''
+    Implementación original del cuaderno, solo para el benchmark
+    '''
+    split_data_list = []
+    for i, row in df.iterrows():
+        words = re.findall(r'\b([a-zA-Z]+n\'t|[a-zA-Z]+\'s|[a-zA-Z]+)\b', row["text"])
+        if len(words) < split_len:
+            n = 1
+        else:
+            n = (len(words) - overlap) // (split_len - overlap) + 1
+        for j in range(n):
+            row['text'] = " ".join(words[(split_len - overlap) * j: (split_len - overlap) * j + split_len])
+            row['word_count'] = len(re.findall(r'\b([a-zA-Z]+n\'t|[a-zA-Z]+\'s|[a-zA-Z]+)\b', row['text']))
+            split_data_list.append(list(row))
+    return pd.DataFrame(split_data_list, columns=df.columns)
+
+def _synthetic_corpus(documents=300, sections=40, seed=0):
+    '''
+    Genera un corpus de guiones con secciones de longitud variable, como el DataFrame de FomcGetData.
+    Las secciones tienen saltos de línea internos, como los textos reales del FOMC
+    '''
+    rng = np.random.RandomState(seed)
+    vocabulary = ['inflation', 'rates', "don't", "committee's", 'economy', 'outlook', 'growth', 'the', 'of',
+                  'employment', 'policy', 'federal', 'funds', 'forecast', 'and', 'labor', 'markets']
+    contents = []
+    for _ in range(documents):
+        parts = []
+        for _ in range(sections):
+            words = list(rng.choice(vocabulary, rng.randint(5, 400)))
+            # Algunas palabras terminan la línea, sin espacio antes de la siguiente
+            for i in rng.choice(len(words), len(words) // 20, replace=False):
+                words[i] += rng.choice(['\n', '\r\n'])
+            parts.append('MR. SMITH. ' + ' '.join(words).replace('\n ', '\n') + '.')
+        contents.append('\n\n[SECTION]\n\n'.join(parts))
+    dates = pd.Timestamp('1990-01-01') + pd.to_timedelta(rng.randint(0, 10000, documents), unit='D')
+    df = pd.DataFrame({'date': dates, 'contents': contents, 'speaker': 'FOMC', 'title': 'FOMC Meeting Transcript'})
+    calendar = pd.DataFrame({'Rate': 5.0, 'RateDecision': rng.randint(-1, 2, 300)},
+                            index=pd.DatetimeIndex(np.sort(rng.choice(pd.date_range('1990-01-01', '2018-01-01').values, 300, replace=False))))
+    return df, calendar
+
+if __name__ == '__main__':
+    # Benchmark sobre un corpus sintético de guiones: tokenización única frente a las funciones del cuaderno
+    df, calendar = _synthetic_corpus()
+    processes = os.cpu_count()
+
+    start = timeit.default_timer()
+    reorganized, filtered, split = preprocess_df(df, 'meeting_script', calendar, processes=1)
+    new_time = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    preprocess_df(df, 'meeting_script', calendar, processes=processes)
+    pool_time = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    legacy_word_count = df['contents'].map(lambda x: len(re.findall(r'\b([a-zA-Z]+n\'t|[a-zA-Z]+\'s|[a-zA-Z]+)\b', x.replace("[SECTION]", ""))))
+    legacy_filtered = _legacy_remove_short_section(reorganized.drop(columns=['section_word_count']))
+    legacy_split = _legacy_get_split_df(legacy_filtered)
+    legacy_time = timeit.default_timer() - start
+
+    assert list(reorganized['word_count']) == list(legacy_word_count)
+    assert list(filtered['text']) == list(legacy_filtered['text']) and list(filtered['word_count']) == list(legacy_filtered['word_count'])
+    assert list(split['text']) == list(legacy_split['text']) and list(split['word_count']) == list(legacy_split['word_count'])
+    print("{} documentos, {} divisiones".format(len(df), len(split)))
+    print("Cuaderno:                      {:.2f} s".format(legacy_time))
+    print("preprocess_df, 1 proceso:      {:.2f} s ({:.1f}x)".format(new_time, legacy_time / new_time))
+    print("preprocess_df, {} procesos:    {:.2f} s ({:.1f}x)".format(processes, pool_time, legacy_time / pool_time))
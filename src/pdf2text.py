@@ -1,32 +1,107 @@
 # Importación de módulos necesarios
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import glob
+import time
 import sys
-from tika import parser
+import os
+
+# Carpeta donde FomcMeetingScript y FomcPresConfScript archivan los PDF descargados
+SCRIPT_PDF_DIR = '../data/FOMC/script_pdf/'
+
+def write_atomic(filepath, text):
+    # Escribe en un archivo temporal de la misma carpeta y lo renombra, de modo que nunca queda un .txt a medias
+    tmp_filepath = filepath + '.tmp'
+    with open(tmp_filepath, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_filepath, filepath)
 
 def pdf2text(filename):
-    # Función para convertir PDF a texto
-    
+    # Función para convertir PDF a texto: `filename` sin la extensión .pdf
+    from tika import parser
+
     # Utiliza el parser de Tika para extraer el contenido del archivo PDF
     raw = parser.from_file(filename + '.pdf')
 
-    # Abre un archivo de texto para escribir el contenido extraído
-    f = open(filename + '.txt', 'w+')
-    
     # Escribe el contenido extraído en el archivo de texto, eliminando espacios en blanco al inicio y al final
-    f.write(raw['content'].strip())
-    
-    # Cierra el archivo de texto
-    f.close()  # Nota: Falta los paréntesis aquí, debería ser f.close()
-
-# Obtiene el nombre del programa y los argumentos de la línea de comandos
-pg_name = sys.argv[0]
-args = sys.argv[1:]
-
-# Verifica si se proporcionó exactamente un argumento
-if len(sys.argv) != 2:
-    # Si no hay exactamente 2 argumentos (nombre del programa + 1 argumento), muestra un mensaje de uso y sale del programa
-    print("Usage: ", pg_name)
-    print("Please specify One argument")
-    sys.exit(1)
-
-# Llama a la función pdf2text con el argumento proporcionado
-pdf2text(args[0])
\ No newline at end of file
+    write_atomic(filename + '.txt', (raw['content'] or '').strip())
+
+def find_pdfs(inputs, recursive=False):
+    # Lista ordenada de PDF de `inputs`: carpetas, patrones glob o archivos
+    pdfs = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*.pdf') if recursive else os.path.join(item, '*.pdf')
+            pdfs.update(glob.glob(pattern, recursive=recursive))
+        else:
+            pdfs.update(path for path in glob.glob(item, recursive=recursive) if path.lower().endswith('.pdf'))
+    return sorted(pdfs)
+
+def is_up_to_date(pdf_filepath):
+    # El .txt existe y es más reciente que el .pdf
+    txt_filepath = os.path.splitext(pdf_filepath)[0] + '.txt'
+    return os.path.exists(txt_filepath) and os.path.getmtime(txt_filepath) >= os.path.getmtime(pdf_filepath)
+
+def start_tika_server():
+    # Arranca (o encuentra ya en marcha) un único servidor Tika local y espera a que responda.
+    # Después, tika-python no vuelve a arrancar la JVM: todas las conversiones son peticiones HTTP a este servidor.
+    from tika import parser
+    parser.from_buffer('')
+
+def convert_batch(inputs, workers=8, force=False, recursive=False):
+    '''
+    Convierte a texto todos los PDF de `inputs` con un solo servidor Tika, repartiendo los archivos entre
+    `workers` threads (el trabajo lo hace la JVM; cada thread solo espera su petición HTTP).
+    Omite los PDF cuyo .txt es más reciente, salvo con `force`.
+    Retorna (convertidos, omitidos, errores).
+    '''
+    pdfs = find_pdfs(inputs, recursive)
+    pending = [pdf for pdf in pdfs if force or not is_up_to_date(pdf)]
+    print("{} PDF, {} ya convertidos, {} pendientes".format(len(pdfs), len(pdfs) - len(pending), len(pending)))
+    if not pending:
+        return 0, len(pdfs), []
+
+    start_tika_server()
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(pdf2text, os.path.splitext(pdf)[0]): pdf for pdf in pending}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print("Error al convertir {}: {}".format(futures[future], e))
+                errors.append(futures[future])
+    return len(pending) - len(errors), len(pdfs) - len(pending), errors
+
+if __name__ == '__main__':
+    # Obtiene el nombre del programa y los argumentos de la línea de comandos
+    pg_name = sys.argv[0]
+    args = sys.argv[1:]
+
+    # Opciones del modo por lotes
+    force = '--force' in args
+    recursive = '--recursive' in args
+    workers = 8
+    if '--workers' in args:
+        workers = int(args[args.index('--workers') + 1])
+        del args[args.index('--workers'):args.index('--workers') + 2]
+    args = [arg for arg in args if arg not in ('--force', '--recursive')]
+
+    # Sin argumentos se convierte el archivo de guiones descargados
+    if not args:
+        args = [SCRIPT_PDF_DIR]
+
+    # Un solo nombre sin extensión: conversión de un archivo, como antes
+    if len(args) == 1 and os.path.exists(args[0] + '.pdf'):
+        pdf2text(args[0])
+        sys.exit(0)
+
+    # Verifica que las entradas son carpetas, patrones o archivos PDF
+    if not find_pdfs(args, recursive):
+        print("Usage: ", pg_name, "[carpeta | patrón glob | archivo.pdf | nombre sin .pdf] ... [--workers N] [--force] [--recursive]")
+        print("No se encontró ningún PDF en: ", ', '.join(args))
+        sys.exit(1)
+
+    start_time = time.perf_counter()
+    converted, skipped, errors = convert_batch(args, workers, force, recursive)
+    print("{} convertidos, {} omitidos, {} errores en {:.1f} s".format(converted, skipped, len(errors), time.perf_counter() - start_time))
+    sys.exit(1 if errors else 0)
@@ -9,29 +9,36 @@ from tpot.export_utils import set_param_recursive
 from sklearn.preprocessing import FunctionTransformer
 from copy import copy
 
-# NOTE: Make sure that the outcome column is labeled 'target' in the data file
-tpot_data = pd.read_csv('PATH/TO/DATA/FILE', sep='COLUMN_SEPARATOR', dtype=np.float64)
-features = tpot_data.drop('target', axis=1)
-training_features, testing_features, training_target, testing_target = \
-            train_test_split(features, tpot_data['target'], random_state=42)
-
-# Average CV score on the training set was: 0.7250000000000001
-exported_pipeline = make_pipeline(
-    make_union(
-        FunctionTransformer(copy),
+def make_exported_pipeline():
+    '''
+    Pipeline exportado por TPOT, sin ajustar (lo usa fomc_compact.py)
+    '''
+    # Average CV score on the training set was: 0.7250000000000001
+    exported_pipeline = make_pipeline(
         make_union(
             FunctionTransformer(copy),
             make_union(
                 FunctionTransformer(copy),
-                FunctionTransformer(copy)
+                make_union(
+                    FunctionTransformer(copy),
+                    FunctionTransformer(copy)
+                )
             )
-        )
-    ),
-    StackingEstimator(estimator=MLPClassifier(activation="relu", alpha=0.001, hidden_layer_sizes=(100, 100), learning_rate="adaptive", solver="adam")),
-    RandomForestClassifier(criterion="gini", max_features="log2", n_estimators=100)
-)
-# Fix random state for all the steps in exported pipeline
-set_param_recursive(exported_pipeline.steps, 'random_state', 42)
+        ),
+        StackingEstimator(estimator=MLPClassifier(activation="relu", alpha=0.001, hidden_layer_sizes=(100, 100), learning_rate="adaptive", solver="adam")),
+        RandomForestClassifier(criterion="gini", max_features="log2", n_estimators=100)
+    )
+    # Fix random state for all the steps in exported pipeline
+    set_param_recursive(exported_pipeline.steps, 'random_state', 42)
+    return exported_pipeline
+
+if __name__ == '__main__':
+    # NOTE: Make sure that the outcome column is labeled 'target' in the data file
+    tpot_data = pd.read_csv('PATH/TO/DATA/FILE', sep='COLUMN_SEPARATOR', dtype=np.float64)
+    features = tpot_data.drop('target', axis=1)
+    training_features, testing_features, training_target, testing_target = \
+                train_test_split(features, tpot_data['target'], random_state=42)
 
-exported_pipeline.fit(training_features, training_target)
-results = exported_pipeline.predict(testing_features)
+    exported_pipeline = make_exported_pipeline()
+    exported_pipeline.fit(training_features, training_target)
+    results = exported_pipeline.predict(testing_features)